@@ -0,0 +1,192 @@
+import argparse
+import json
+import math
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from PlanGenerator import PlanGenerator
+
+src_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+sys.path.insert(0, src_path)
+
+from VersionHelper import get_version, version_to_str
+
+
+class Benchmark:
+    '''
+    Writes synthetic plans of increasing size and runs CSVFloorSketcher on each of them with --profile-json.
+    Per-layer stages ("svg build 1-EG", ...) are summed up to one stage. Every run is repeated and the fastest
+    time of each stage is kept. Memory is not traced unless requested, because tracing distorts the times.
+    The size of the written files (pdf and svg) is reported as well.
+    '''
+    # Growth of the time per stage compared to the growth of the input, above which a stage is reported as superlinear
+    superlinear_exponent = 1.3
+
+    def __init__(self, sizes:list[int], layers:int, reference_depth:int, repeat:int, trace_memory:bool, extra_args:list[str], precision:int = None):
+        self.sizes = sizes
+        self.layers = layers
+        self.reference_depth = reference_depth
+        self.precision = precision
+        self.repeat = repeat
+        self.trace_memory = trace_memory
+        self.extra_args = extra_args
+
+    def run(self):
+        results = list()
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for size in self.sizes:
+                results.append(self.run_size(temp_dir, size))
+
+        return {
+            'version': version_to_str(*get_version()),
+            'commit': Benchmark.get_commit(),
+            'python': sys.version.split()[0],
+            'args': self.extra_args,
+            'precision': self.precision,
+            'results': results
+        }
+
+    def run_size(self, temp_dir, size:int):
+        # The rooms are the unit of the size, all other parts grow with them
+        planGenerator = PlanGenerator(self.layers, size, size, max(1, size//20), size//2, self.reference_depth, precision=self.precision)
+        csv_file = os.path.join(temp_dir, f'plan_{size}.csv')
+        planGenerator.save(csv_file)
+        trace_file = os.path.join(temp_dir, f'plan_{size}.json')
+
+        args = [sys.executable, os.path.join(src_path, 'CSVFloorSketcher.py'), csv_file, '--quiet', '--no-cache', '--profile-json', trace_file]
+        if not self.trace_memory:
+            args.append('--profile-no-memory')
+
+        stages = dict()
+        peak_memory = dict()
+        total = math.inf
+        for _ in range(self.repeat):
+            subprocess.run(args + self.extra_args, check=True)
+
+            with open(trace_file) as f:
+                trace = json.load(f)
+
+            run_stages = dict()
+            for stage in trace['stages']:
+                name = Benchmark.get_stage_group(stage['name'])
+                run_stages[name] = run_stages.get(name, 0) + stage['wall_time_s']
+                peak_memory[name] = max(peak_memory.get(name, 0), stage['peak_memory_bytes'])
+
+            for name, wall_time in run_stages.items():
+                stages[name] = min(stages.get(name, math.inf), wall_time)
+            total = min(total, trace['total_wall_time_s'])
+
+        return {
+            'size': size,
+            'parts': trace['part_count'],
+            'total_wall_time_s': total,
+            'stages': stages,
+            'output_bytes': Benchmark.get_output_size(temp_dir, f'plan_{size}'),
+            'peak_memory_bytes': peak_memory if self.trace_memory else None
+        }
+
+    def get_output_size(temp_dir, file_name_base:str):
+        '''Size of the pdf and svg files of the plan in bytes.'''
+        file_names = filter(lambda n: n.startswith(file_name_base) and n.endswith(('.pdf', '.svg')), os.listdir(temp_dir))
+        return sum(map(lambda n: os.path.getsize(os.path.join(temp_dir, n)), file_names))
+
+    def get_stage_group(name:str):
+        '''Name of the stage without the layer.'''
+        return re.sub(r' \d+-L\d+$', '', name)
+
+    def get_commit():
+        try:
+            result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=src_path)
+        except OSError:
+            return None
+        return result.stdout.strip() or None
+
+    def print_results(results:dict, baseline:dict = None):
+        print(f'Version {results['version']} ({results['commit']}), Python {results['python']}, precision {results.get('precision')}')
+
+        results = results['results']
+        stage_names = list(dict.fromkeys(name for result in results for name in result['stages']))
+
+        print(f'{'Stage':<22}' + ''.join(map(lambda n: f'{str(n['size'])+' rooms':>14}', results)) + f'{'Exponent':>10}')
+        for name in stage_names + ['total']:
+            times = list(map(lambda n: Benchmark.get_time(n, name), results))
+            exponent = Benchmark.get_exponent(results, name)
+
+            line = f'{name:<22}' + ''.join(map(lambda n: f'{n*1000:>11.1f} ms' if n is not None else f'{'-':>14}', times))
+            line += f'{exponent:>10.2f}' if exponent is not None else f'{'-':>10}'
+            if exponent is not None and exponent > Benchmark.superlinear_exponent:
+                line += '  superlinear'
+            print(line)
+
+        print(f'{'output size':<22}' + ''.join(map(lambda n: f'{n['output_bytes']/1024:>11.1f} kB' if 'output_bytes' in n else f'{'-':>14}', results)))
+
+        if baseline is not None:
+            print(f'\nCompared to {baseline['version']} ({baseline['commit']}):')
+            baseline_results = dict(map(lambda n: (n['size'], n), baseline['results']))
+            for result in results:
+                if result['size'] not in baseline_results:
+                    continue
+                baseline_result = baseline_results[result['size']]
+                for name in stage_names + ['total']:
+                    time = Benchmark.get_time(result, name)
+                    baseline_time = Benchmark.get_time(baseline_result, name)
+                    if time is None or not baseline_time:
+                        continue
+                    print(f'{str(result['size'])+' rooms':<12} {name:<22} {time/baseline_time:>7.2f}x')
+                if result.get('output_bytes') and baseline_result.get('output_bytes'):
+                    print(f'{str(result['size'])+' rooms':<12} {'output size':<22} {result['output_bytes']/baseline_result['output_bytes']:>7.2f}x')
+
+    def get_time(result:dict, name:str):
+        if name == 'total':
+            return result['total_wall_time_s']
+        return result['stages'].get(name)
+
+    def get_exponent(results:list[dict], name:str):
+        '''Slope of time over size in log-log scale between the two biggest sizes (1 means linear growth).'''
+        if len(results) < 2:
+            return None
+
+        small, big = results[-2], results[-1]
+        small_time, big_time = Benchmark.get_time(small, name), Benchmark.get_time(big, name)
+        # Times near the timer resolution give no meaningful exponent
+        if not small_time or not big_time or small_time < 1e-3:
+            return None
+
+        return math.log(big_time/small_time) / math.log(big['parts']/small['parts'])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Misst die Laufzeit der einzelnen Schritte von CSVFloorSketcher mit synthetischen Plänen verschiedener Größe.")
+    parser.add_argument('--sizes', type=str, default='50,200,800', help='Anzahl der Räume je Ebene, mit Komma getrennt')
+    parser.add_argument('--layers', type=int, default=2, help='Anzahl der Ebenen')
+    parser.add_argument('--reference-depth', type=int, default=10, help='Länge der Referenzketten zwischen den Räumen')
+    parser.add_argument('--repeat', type=int, default=3, help='Anzahl der Wiederholungen je Größe, die schnellste zählt')
+    parser.add_argument('--memory', action="store_true", help='Misst zusätzlich den maximalen Speicherbedarf (verfälscht die Laufzeiten)')
+    parser.add_argument('--output', type=str, help='Pfad einer json-Datei, in die die Ergebnisse geschrieben werden')
+    parser.add_argument('--compare', type=str, help='Pfad einer json-Datei mit Ergebnissen eines früheren Laufs zum Vergleich')
+    parser.add_argument('--precision', type=int, help='Nachkommastellen der Koordinaten in den svg-Dateien der Pläne (Einstellung "Precision")')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help='Weitere Argumente für CSVFloorSketcher (nach "--")')
+    args = parser.parse_args()
+
+    extra_args = args.args[1:] if args.args[:1] == ['--'] else args.args
+    sizes = list(map(int, args.sizes.split(',')))
+
+    benchmark = Benchmark(sizes, args.layers, args.reference_depth, args.repeat, args.memory, extra_args, args.precision)
+    results = benchmark.run()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    Benchmark.print_results(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
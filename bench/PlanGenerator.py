@@ -0,0 +1,105 @@
+import argparse
+import csv
+import gzip
+import random
+
+
+class PlanGenerator:
+    '''
+    Generates synthetic construction plans (csv) for benchmarks. Every layer has an outline and a grid of rooms.
+    The rooms of a grid row reference their predecessor, so the length of a row is the reference depth.
+    '''
+    room_width = 300
+    room_height = 250
+    wall = 12
+    margin = 25
+
+    def __init__(self, layers:int, rooms:int, dims:int, stairs:int, arcs:int, reference_depth:int, seed:int = 0, precision:int = None):
+        self.layers = layers
+        self.rooms = rooms
+        self.dims = dims
+        self.stairs = stairs
+        self.arcs = arcs
+        self.reference_depth = max(1, reference_depth)
+        self.random = random.Random(seed)
+        self.precision = precision
+
+    def generate(self):
+        '''Yields the rows of the plan, the first row is the header.'''
+        yield ['Identifier', 'Layer', 'Type', 'Dim-Offset', 'Reference']
+
+        columns = min(self.rooms, self.reference_depth)
+        rows = -(-self.rooms // columns)
+        outline_width = 2*self.margin + columns*(self.room_width+self.wall)
+        outline_height = 2*self.margin + rows*(self.room_height+self.wall)
+
+        yield ['PageSize', '', 'Settings', '', '', 'A3']
+        # The outline has to fit into the plan border of the A3 page (about 24 cm x 30 cm)
+        yield ['ScaleDivisor', '', 'Settings', '', '', str(max(50, -(-outline_width//24), -(-outline_height//30)))]
+        yield ['CompassRotation', '', 'Settings', '', '', '30']
+        if self.precision is not None:
+            yield ['Precision', '', 'Settings', '', '', str(self.precision)]
+        yield ['Objekt', '', 'MetaInformation', '', '', 'Synthetischer Plan']
+
+        for layer_index in range(self.layers):
+            layer = f'{layer_index+1}-L{layer_index}'
+            yield from self.generate_layer(layer, outline_width, outline_height)
+
+    def generate_layer(self, layer, outline_width, outline_height):
+        yield ['Haus', layer, 'Outline', '', '(0,0)', '(0,0)', f'({outline_width},0)', f'({outline_width},{outline_height})', f'(0,{outline_height})']
+
+        for i in range(self.rooms):
+            if i % self.reference_depth == 0:
+                row = i // self.reference_depth
+                reference = f'(Haus-1)+({self.margin},{self.margin + row*(self.room_height+self.wall)})'
+            else:
+                reference = f'(R{i-1}-2)+({self.wall},0)'
+
+            width = self.room_width - self.random.randrange(0, 50)
+            yield ['R'+str(i), layer, 'Room', '', reference, '(0,0)', f'({width},0)', f'({width},{self.room_height})', f'(0,{self.room_height})']
+            yield ['L'+str(i), layer, 'Label', '', f'(R{i}-1)+(20,40)', f'Raum {i}', f'{width*self.room_height/10000:.1f} m²']
+
+        # Dimension chains along the rooms of a grid row
+        for i in range(min(self.dims, self.rooms)):
+            yield ['DX'+str(i), layer, 'XDimC', '20', '', f'(R{i}-1)', f'(R{i}-2)']
+            yield ['DY'+str(i), layer, 'YDim', '20', '', f'(R{i}-2)', f'(R{i}-3)']
+
+        for i in range(self.arcs):
+            room = i % self.rooms
+            yield ['OA'+str(i), layer, 'OpeningArc', '', f'(R{room}-1)+({10 + (i//self.rooms)*5 % 150},0)', '(0,0)', '(90,0)', '(0,90)']
+
+        for i in range(self.stairs):
+            room = i % self.rooms
+            yield ['ST'+str(i), layer, 'Stairs', '', f'(R{room}-4)+(10,-170)', '(0,0)', '(120,0)', '(120,160)', '(20,160)', '(20,120)', '(0,120)']
+            yield ['STP'+str(i), layer, 'Steps', '', f'(ST{i}-1)', '(0,0)', '(20,0)', '(120,120)', '(120,140)', '(120,160)', '(20,160)', '(20,140)', '(20,120)', '(20,120)', '(0,120)']
+
+    def save(self, file_path):
+        if file_path.endswith('.gz'):
+            f = gzip.open(file_path, 'wt', newline='')
+        else:
+            f = open(file_path, 'w', newline='')
+
+        with f:
+            writer = csv.writer(f, quoting=csv.QUOTE_MINIMAL)
+            writer.writerows(self.generate())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Erzeugt eine synthetische Bemaßungstabelle für Benchmarks.")
+    parser.add_argument('ausgabe', type=str, help='Pfad der erzeugten Bemaßungstabelle (auch *.csv.gz)')
+    parser.add_argument('--layers', type=int, default=2, help='Anzahl der Ebenen')
+    parser.add_argument('--rooms', type=int, default=20, help='Anzahl der Räume je Ebene')
+    parser.add_argument('--dims', type=int, default=20, help='Anzahl der Bemaßungen je Ebene (jeweils eine Maßkette in x- und eine Bemaßung in y-Richtung)')
+    parser.add_argument('--stairs', type=int, default=2, help='Anzahl der Treppen je Ebene')
+    parser.add_argument('--arcs', type=int, default=10, help='Anzahl der Öffnungsbögen je Ebene')
+    parser.add_argument('--reference-depth', type=int, default=5, help='Länge der Referenzketten zwischen den Räumen')
+    parser.add_argument('--seed', type=int, default=0, help='Startwert des Zufallsgenerators')
+    parser.add_argument('--precision', type=int, help='Nachkommastellen der Koordinaten in den svg-Dateien (Einstellung "Precision")')
+    args = parser.parse_args()
+
+    planGenerator = PlanGenerator(args.layers, args.rooms, args.dims, args.stairs, args.arcs, args.reference_depth, args.seed, args.precision)
+    planGenerator.save(args.ausgabe)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,71 +1,359 @@
 import argparse
+from functools import partial
+import glob
+import io
+import multiprocessing
 import os
+import sys
+from typing import List
 from CSVLoader import CSVLoader
-from ConsolePrinter import print_error, print_info
+import CompiledPlan
+import ConsolePrinter
+from ConsolePrinter import is_debug_enabled, print_debug, print_error, print_info
 from ConstructionPlanSet import ConstructionPlanSet
 from ConstructionPlanWriter import ConstructionPlanWriter
+from DiskPageCache import DiskPageCache
 from Exceptions.InputError import InputError
+from GeometrySimplifier import GeometrySimplifier
+from PlanBatch import PlanBatch
+from PlanWatcher import PlanWatcher
+from Profiler import Profiler
+from VersionHelper import get_version, version_to_str
 
 
+def load_entries(csv_file):
+    return parse_data(read_data(csv_file))
+
 def read_data(csv_file):
     cSVLader = CSVLoader(csv_file)
     return cSVLader.load()
 
 def parse_data(data):
-    data_dict = []
-    for i in range(1,len(data)): # Skip first line
-        date = data[i]
+    '''Yields the entries of the rows (line number, fields) one by one. The first row is the header.'''
+    for line_number, date in data:
+        if line_number == 1: # Skip first line
+            continue
+
         if date:
-            if date[2] == '':
-                print_info(f'Skipping data because the type is not specified - line: {i} - {date}')
+            if len(date) < 3 or date[2] == '':
+                print_info(f'Skipping data because the type is not specified - line: {line_number} - {date}')
                 continue
 
-            print_info(f'Parsing data - line: {i} - {date}')
+            if is_debug_enabled():
+                print_debug(f'Parsing data - line: {line_number} - {date}')
 
+            date = date + ['']*(5-len(date))
             payload = date[5:len(date)]
             payload = list(filter(lambda n: n!='', payload))
-            data_dict.append(
-                {
+            yield {
+                    'Line':line_number,
                     'Identifier':date[0],
                     'Layer':date[1],
                     'Type':date[2],
                     'DimOffset':date[3],
                     'Reference':date[4],
                     'Payload':payload
-                })
-        
-    return data_dict
+                }
+
+def get_file_path_base(csv_file, output):
+    if output == '-':
+        # Only the pdf can be written to stdout, there is no file path
+        return None
+
+    if output:
+        file_path_without_ext, ext = os.path.splitext(output)
+        return file_path_without_ext
+
+    if csv_file == '-':
+        raise InputError('The output path (--output) is required when reading from stdin')
+
+    file_path_without_ext = csv_file
+    if file_path_without_ext.endswith('.gz'):
+        file_path_without_ext = file_path_without_ext[:-3]
+    file_path_without_ext, ext = os.path.splitext(file_path_without_ext)
+    return file_path_without_ext
+
+def get_csv_files(paths):
+    '''Returns the csv files of the given paths. Directories contain all of their *.csv(.gz) files, patterns are expanded.'''
+    csv_files = list()
+    for path in paths:
+        if path == '-':
+            csv_files.append(path)
+        elif os.path.isdir(path):
+            files = glob.glob(os.path.join(glob.escape(path), '*.csv')) + glob.glob(os.path.join(glob.escape(path), '*.csv.gz'))
+            if not files:
+                raise InputError(f'Directory {path} contains no csv files')
+            csv_files.extend(sorted(files))
+        elif any(map(lambda n: n in path, '*?[')):
+            # The windows shell does not expand patterns
+            files = glob.glob(path)
+            if not files:
+                raise InputError(f'No file matches {path}')
+            csv_files.extend(sorted(files))
+        else:
+            csv_files.append(path)
+
+    return list(dict.fromkeys(csv_files))
+
+def get_tile_overlap(args):
+    return args.tile_overlap if args.tiles else None
+
+def make_plan_set(rows, profiler:Profiler = None) -> ConstructionPlanSet:
+    profiler = profiler or Profiler()
+    constructionPlanSet = ConstructionPlanSet()
+    
+    # Rows are read, parsed and added one by one
+    for date in profiler.iterate('parse', parse_data(rows)):
+        with profiler.stage('add data'):
+            constructionPlanSet.add_data(date)
+
+    with profiler.stage('reference resolution'):
+        constructionPlanSet.resolve()
+
+    return constructionPlanSet
+
+def make_plan_set_from_text(csv_text:str) -> ConstructionPlanSet:
+    return make_plan_set(CSVLoader.read(io.StringIO(csv_text, newline='')))
+
+def load_plan_set(csv_file, profiler:Profiler = None) -> ConstructionPlanSet:
+    '''Returns the resolved plan set of a csv file or a compiled plan.'''
+    profiler = profiler or Profiler()
+    if CompiledPlan.is_compiled_plan(csv_file):
+        with profiler.stage('compiled plan load'):
+            return CompiledPlan.load_compiled_plan(csv_file)
+
+    return make_plan_set(profiler.iterate('csv load', read_data(csv_file)), profiler)
+
+def compile_plan(csv_file, output:str = None):
+    if CompiledPlan.is_compiled_plan(csv_file):
+        raise InputError(f'{csv_file} is already compiled')
+
+    constructionPlanSet = load_plan_set(csv_file)
+    CompiledPlan.save_compiled_plan(constructionPlanSet, get_file_path_base(csv_file, output) + CompiledPlan.file_ext)
+
+def check_plan(csv_file) -> List[InputError]:
+    '''
+    Returns all errors of the plan sorted by line. The entries are added and resolved as far as possible, nothing is
+    drawn, so reportlab and svglib are not needed.
+    '''
+    errors = list()
+    if CompiledPlan.is_compiled_plan(csv_file):
+        constructionPlanSet = CompiledPlan.load_compiled_plan(csv_file)
+    else:
+        constructionPlanSet = ConstructionPlanSet()
+        for date in load_entries(csv_file):
+            try:
+                constructionPlanSet.add_data(date)
+            except InputError as e:
+                errors.append(e)
+        errors.extend(constructionPlanSet.try_resolve())
+
+    for name, error in ConstructionPlanWriter.get_setting_errors(constructionPlanSet.settings).items():
+        line = constructionPlanSet.setting_lines.get(name)
+        location = name if line is None else f'line {line} - {name}'
+        errors.append(InputError(f'{location}: {error}', line))
+
+    return sorted(errors, key=lambda n: 0 if n.line is None else n.line)
+
+def check_plans(csv_files:List[str]):
+    '''Prints the errors of all plans and returns the exit code (1 if any plan has errors).'''
+    error_count = 0
+    for csv_file in csv_files:
+        try:
+            errors = check_plan(csv_file)
+        except (InputError, OSError) as e:
+            errors = [e]
+
+        for error in errors:
+            print_error(f'{csv_file}: {error}')
+        error_count += len(errors)
+
+    print_info(f'{len(csv_files)} plan(s) checked, {error_count} error(s)')
+    return 1 if error_count > 0 else 0
+
+def make_plan(csv_file, args, jobs, profiler:Profiler = None):
+    profiler = profiler or Profiler()
+    file_path_without_ext = get_file_path_base(csv_file, args.output)
+
+    constructionPlanSet = load_plan_set(csv_file, profiler)
+
+    simplifier = None
+    if args.simplify:
+        with profiler.stage('simplify'):
+            simplifier = GeometrySimplifier(args.simplify_tolerance)
+            simplifier.simplify(constructionPlanSet)
+
+    constructionPlanWriter = ConstructionPlanWriter(file_path_without_ext, constructionPlanSet, args.debug, args.backend, profiler, get_tile_overlap(args), simplifier)
+    if args.svg_only:
+        constructionPlanWriter.write_svg_files(jobs)
+        return constructionPlanSet
+
+    page_cache = None if args.no_cache else DiskPageCache(args.cache_dir, args.cache_size*1024*1024)
+    pdf_stream = sys.stdout.buffer if args.output == '-' else None
+    constructionPlanWriter.write(args.svg, jobs, page_cache, pdf_stream, args.compact_pdf, args.pipeline)
+
+    return constructionPlanSet
+
+def compile_plans(argv):
+    parser = argparse.ArgumentParser(prog='CSVFloorSketcher.py compile', description=f"Liest Bemaßungstabellen ein und speichert die aufgelösten Baupläne als kompilierte Dateien (*{CompiledPlan.file_ext}). Diese können anstelle der Bemaßungstabelle angegeben werden, die Tabelle wird dann nicht erneut eingelesen.")
+    parser.add_argument('daten', type=str, nargs='+', help='Pfad der Bemaßungstabelle (auch *.csv.gz, "-" liest von stdin). Mehrere Pfade, Verzeichnisse und Muster sind möglich.')
+    parser.add_argument('--output', type=str, help=f'Pfad der kompilierten Datei. Standard ist der Pfad der Bemaßungstabelle mit Endung "{CompiledPlan.file_ext}".')
+    parser.add_argument('--jobs', type=int, default=1, help='Anzahl der Prozesse, auf die die Bemaßungstabellen verteilt werden.')
+    log_group = parser.add_mutually_exclusive_group()
+    log_group.add_argument('--quiet', action="store_true", help='Gibt nur Fehler aus.')
+    log_group.add_argument('--verbose', action="store_true", help='Gibt zusätzlich jede gelesene Zeile aus.')
+
+    args = parser.parse_args(argv)
+
+    if args.quiet:
+        ConsolePrinter.set_log_level(ConsolePrinter.QUIET)
+    elif args.verbose:
+        ConsolePrinter.set_log_level(ConsolePrinter.DEBUG)
+
+    if args.output == '-':
+        # Compiled plans are memory mapped when they are loaded, they are only written to files
+        raise InputError('Compiled plans can not be written to stdout, use --output with a file path')
+
+    csv_files = get_csv_files(args.daten)
+    if len(csv_files) > 1:
+        if '-' in csv_files:
+            raise InputError('stdin can not be combined with other files')
+        if args.output:
+            raise InputError('--output is only supported for a single file')
+
+        planBatch = PlanBatch(csv_files, compile_plan, args.jobs)
+        return 1 if planBatch.run() > 0 else 0
+
+    compile_plan(csv_files[0], args.output)
+
+def serve(argv):
+    parser = argparse.ArgumentParser(prog='CSVFloorSketcher.py serve', description="Startet einen lokalen Server, der Baupläne aus per http gesendeten Bemaßungstabellen erzeugt (POST /pdf, POST /svg?layer=<Ebene>).")
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Adresse, an die der Server gebunden wird (Standard 127.0.0.1).')
+    parser.add_argument('--port', type=int, default=8765, help='Port des Servers (Standard 8765, 0 wählt einen freien Port).')
+    parser.add_argument('--jobs', type=int, default=1, help='Anzahl der Baupläne, die gleichzeitig erzeugt werden (Standard 1).')
+    parser.add_argument('--queue', type=int, default=8, help='Anzahl der Anfragen, die auf das Erzeugen warten. Weitere Anfragen werden abgelehnt (Standard 8).')
+    parser.add_argument('--cache-entries', type=int, default=32, help='Anzahl der zuletzt erzeugten Ergebnisse, die im Speicher gehalten werden (Standard 32).')
+    log_group = parser.add_mutually_exclusive_group()
+    log_group.add_argument('--quiet', action="store_true", help='Gibt nur Fehler aus.')
+    log_group.add_argument('--verbose', action="store_true", help='Gibt zusätzlich jede Anfrage und jede gelesene Zeile aus.')
+
+    args = parser.parse_args(argv)
+
+    if args.quiet:
+        ConsolePrinter.set_log_level(ConsolePrinter.QUIET)
+    elif args.verbose:
+        ConsolePrinter.set_log_level(ConsolePrinter.DEBUG)
+
+    if args.jobs < 1 or args.queue < 0 or args.cache_entries < 0:
+        raise InputError('--jobs must be positive, --queue and --cache-entries must not be negative')
+
+    # The http server is only imported when it is used
+    from PlanServer import PlanServer
+    planServer = PlanServer(args.host, args.port, make_plan_set_from_text, args.jobs, args.queue, args.cache_entries)
+    planServer.run()
 
 def main():
-    parser = argparse.ArgumentParser(description="Erzeugt einen Bauplan auf Basis einer Bemaßungstabelle.")
-    parser.add_argument('daten', type=str, help='Pfad der Bemaßungstabelle')
+    if sys.argv[1:2] == ['serve']:
+        return serve(sys.argv[2:])
+    if sys.argv[1:2] == ['compile']:
+        return compile_plans(sys.argv[2:])
+
+    parser = argparse.ArgumentParser(description="Erzeugt einen Bauplan auf Basis einer Bemaßungstabelle. \"%(prog)s compile --help\" beschreibt das Kompilieren von Bemaßungstabellen, \"%(prog)s serve --help\" den lokalen Server.")
+    parser.add_argument('daten', type=str, nargs='+', help=f'Pfad der Bemaßungstabelle (auch *.csv.gz oder kompiliert *{CompiledPlan.file_ext}, "-" liest von stdin). Mehrere Pfade, Verzeichnisse und Muster (z.B. "plaene/*.csv") erzeugen mehrere Baupläne in einem Lauf.')
+    parser.add_argument('--output', type=str, help='Pfad der erzeugten pdf-Datei. Standard ist der Pfad der Bemaßungstabelle mit Endung ".pdf". "-" schreibt die pdf-Datei nach stdout.')
+    parser.add_argument('--compact-pdf', action="store_true", help='Speichert die Inhalte der pdf-Datei binär statt als Text. Die Datei wird dadurch kleiner.')
+    parser.add_argument('--check', action="store_true", help='Prüft die Bemaßungstabellen nur und gibt alle Fehler mit Zeilennummer aus, ohne einen Bauplan zu erzeugen. Der Rückgabewert ist 1, wenn ein Fehler gefunden wurde.')
     parser.add_argument('--debug', action="store_true", help='Erweitert die Zeichnung um Informationen, die die Arbeit mit der Zeichnung erleichtern.')
     parser.add_argument('--svg', action="store_true", help='Erzeugt zusätzlich die rohen svg-Dateien.')
+    parser.add_argument('--svg-only', action="store_true", help='Erzeugt nur die svg-Dateien und keine pdf-Datei. Dadurch startet das Programm schneller.')
+    parser.add_argument('--tiles', action="store_true", help='Teilt Ebenen, die im gewählten Maßstab nicht auf eine Seite passen, auf mehrere überlappende Seiten auf.')
+    parser.add_argument('--tile-overlap', type=float, default=1, help='Überlappung der Seiten beim Aufteilen in cm (Standard 1).')
+    parser.add_argument('--simplify', action="store_true", help='Entfernt doppelte und auf einer Linie liegende Punkte von Umrissen, Räumen, Treppen und Durchgängen. Punkte, auf die verwiesen wird, bleiben erhalten.')
+    parser.add_argument('--simplify-tolerance', type=float, default=0.5, help='Maximaler Abstand eines entfernten Punktes zur vereinfachten Linie in cm (Standard 0.5).')
+    parser.add_argument('--jobs', type=int, default=1, help='Anzahl der Prozesse, auf die das Zeichnen der Ebenen verteilt wird. Bei mehreren Bemaßungstabellen werden die Tabellen verteilt.')
+    parser.add_argument('--pipeline', action="store_true", help='Erzeugt die nächste Seite und speichert die svg-Dateien in Hintergrund-Threads, während eine Seite gezeichnet wird. Nur ohne mehrere Prozesse (--jobs 1), z.B. wenn keine Prozesse gestartet werden können.')
+    parser.add_argument('--no-cache', action="store_true", help='Verwendet keine zwischengespeicherten Seiten und speichert keine Seiten zwischen.')
+    parser.add_argument('--cache-dir', type=str, help='Verzeichnis, in dem gezeichnete Seiten zwischengespeichert werden. Standard ist das Cache-Verzeichnis des Benutzers.')
+    parser.add_argument('--cache-size', type=int, default=DiskPageCache.default_max_size//(1024*1024), help='Maximale Größe des Cache-Verzeichnisses in MB. Die am längsten nicht verwendeten Seiten werden zuerst entfernt.')
+    parser.add_argument('--watch', action="store_true", help='Beobachtet die Bemaßungstabelle und erzeugt den Bauplan bei jeder Änderung neu. Dabei werden nur geänderte Ebenen neu gezeichnet.')
+    parser.add_argument('--backend', choices=ConstructionPlanWriter.backends, default='reportlab', help='Verfahren zur Erzeugung der pdf-Datei: "reportlab" zeichnet direkt, "svg" über den Umweg der svg-Datei.')
+    log_group = parser.add_mutually_exclusive_group()
+    log_group.add_argument('--quiet', action="store_true", help='Gibt nur Fehler aus.')
+    log_group.add_argument('--verbose', action="store_true", help='Gibt zusätzlich jede gelesene Zeile aus.')
+    parser.add_argument('--profile', action="store_true", help='Gibt Laufzeit und maximalen Speicherbedarf der einzelnen Schritte aus.')
+    parser.add_argument('--profile-json', type=str, help='Pfad einer json-Datei, in die Laufzeit und maximaler Speicherbedarf der einzelnen Schritte geschrieben werden.')
+    parser.add_argument('--profile-no-memory', action="store_true", help='Misst beim Profiling nur die Laufzeit. Das Messen des Speicherbedarfs verlangsamt die Ausführung deutlich.')
     
     args = parser.parse_args()
-    csv_file = args.daten
     debug_mode = args.debug
     is_savig_svg = args.svg
-    
-    file_path_without_ext, ext = os.path.splitext(csv_file)
 
-    data = read_data(csv_file)
+    if args.output == '-':
+        # stdout is reserved for the pdf
+        ConsolePrinter.use_stderr()
+        if args.svg or args.svg_only:
+            raise InputError('svg files can not be written to stdout, use --output with a file path')
 
-    data_dict = parse_data(data)
+    if args.quiet:
+        ConsolePrinter.set_log_level(ConsolePrinter.QUIET)
+    elif args.verbose:
+        ConsolePrinter.set_log_level(ConsolePrinter.DEBUG)
 
-    constructionPlanSet = ConstructionPlanSet()
-    
-    for date in data_dict:
-        constructionPlanSet.add_data(date)
+    if args.simplify_tolerance < 0:
+        raise InputError('The simplify tolerance must not be negative')
+
+    csv_files = get_csv_files(args.daten)
+    if args.check:
+        return check_plans(csv_files)
 
-    constructionPlanWriter = ConstructionPlanWriter(file_path_without_ext, constructionPlanSet, debug_mode)
-    constructionPlanWriter.write(is_savig_svg)
+    if len(csv_files) > 1:
+        if '-' in csv_files:
+            raise InputError('stdin can not be combined with other files')
+        if args.output or args.watch or args.profile or args.profile_json:
+            raise InputError('--output, --watch and --profile are only supported for a single file')
+
+        planBatch = PlanBatch(csv_files, partial(make_plan, args=args, jobs=1), args.jobs)
+        return 1 if planBatch.run() > 0 else 0
+
+    csv_file = csv_files[0]
+    file_path_without_ext = get_file_path_base(csv_file, args.output)
+
+    if args.watch:
+        if csv_file == '-':
+            raise InputError('stdin can not be watched')
+        if CompiledPlan.is_compiled_plan(csv_file):
+            raise InputError('Compiled plans can not be watched, watch the csv file instead')
+        if args.svg_only:
+            raise InputError('--svg-only is not supported in watch mode')
+        if args.output == '-':
+            raise InputError('stdout can not be used in watch mode')
+
+        planWatcher = PlanWatcher(csv_file, load_entries, file_path_without_ext, debug_mode, args.backend, is_savig_svg, args.jobs, get_tile_overlap(args), args.simplify_tolerance if args.simplify else None)
+        planWatcher.run()
+        return
+
+    profiler = Profiler(args.profile or args.profile_json is not None, not args.profile_no_memory)
+    constructionPlanSet = make_plan(csv_file, args, args.jobs, profiler)
+
+    profiler.report()
+    if args.profile_json:
+        profiler.save_json(args.profile_json,
+            version=version_to_str(*get_version()),
+            input=csv_file,
+            backend=args.backend,
+            jobs=args.jobs,
+            part_count=len(constructionPlanSet.part_list))
 
 
 if __name__ == '__main__':
+    # Needed for the process pool of the frozen executable
+    multiprocessing.freeze_support()
+
     try:
-        main()
-    except InputError as e: print_error(e)
+        sys.exit(main())
+    except InputError as e:
+        print_error(e)
+        sys.exit(1)
         
         
     
@@ -1,4 +1,8 @@
 import csv
+import gzip
+import io
+import sys
+from typing import TextIO
 
 
 class CSVLoader:
@@ -6,10 +10,24 @@ class CSVLoader:
         self.file_path = file_path
 
     def load(self):
-        data = []
-        with open(self.file_path, newline='') as csvfile:
-            reader = csv.reader(csvfile)
+        '''Yields the line number and the fields of every row. "-" reads from stdin, *.gz files are decompressed.'''
+        with self.open() as csvfile:
+            yield from CSVLoader.read(csvfile)
 
-            for row in reader:
-                data.append(row)
-        return data
+    def read(csvfile:TextIO):
+        '''Yields the line number and the fields of every row of an opened csv file.'''
+        reader = csv.reader(csvfile)
+
+        line_number = 1
+        for row in reader:
+            yield line_number, row
+            # Rows can span several lines if a field contains a line break
+            line_number = reader.line_num + 1
+
+    def open(self):
+        if self.file_path == '-':
+            return io.TextIOWrapper(sys.stdin.buffer, newline='')
+        elif self.file_path.endswith('.gz'):
+            return gzip.open(self.file_path, 'rt', newline='')
+        else:
+            return open(self.file_path, newline='')
@@ -0,0 +1,182 @@
+'''
+Compiled plans store a resolved ConstructionPlanSet, so plans can be written again without reading and resolving the
+csv file. Layout (little endian):
+
+    magic (8 bytes) | format version (uint32) | header length (uint32) | header (json) | arrays
+
+The header holds the strings (settings, meta information except the defaults, layer keys, identifiers, label texts,
+referenced points) and the offset, dtype and shape of every array. Arrays start at multiples of 64 bytes and are
+memory mapped when the plan is loaded, so the points of the parts are not copied.
+
+Points and references keep their dtype (integer or floating) per part, so the pages of a compiled plan have the same
+page keys as the pages of the csv file.
+'''
+import json
+import mmap
+import struct
+import numpy as np
+from ConstructionPlanSet import ConstructionPlanSet
+from DataType import DataType
+from Exceptions.InputError import InputError
+from FileHelper import open_atomic
+from Part import Part
+from PartLabel import PartLabel
+
+
+file_ext = '.fsplan'
+magic = b'FSPLAN\0\0'
+format_version = 1
+prefix = struct.Struct('<8sII')
+alignment = 64
+
+# Dtype flags of points and references
+NONE = -1
+INT = 0
+FLOAT = 1
+
+def is_compiled_plan(file_path:str):
+    return file_path.endswith(file_ext)
+
+def get_dtype_flag(values:np.ndarray):
+    if values is None:
+        return NONE
+    return INT if np.issubdtype(values.dtype, np.integer) else FLOAT
+
+def save_compiled_plan(constructionPlanSet:ConstructionPlanSet, file_path:str):
+    parts = [part for layer_key in constructionPlanSet.parts_by_layer.keys() for part in constructionPlanSet.parts_by_layer[layer_key]]
+    nodes = [node for layer_key in constructionPlanSet.parts_by_layer.keys() for _, node in constructionPlanSet.layer_sort_keys[layer_key]]
+    layer_keys = list(constructionPlanSet.parts_by_layer.keys())
+    layer_indices = [i for i, layer_key in enumerate(layer_keys) for _ in constructionPlanSet.parts_by_layer[layer_key]]
+
+    point_flags = np.array([get_dtype_flag(part.points) for part in parts], dtype=np.int8)
+    point_counts = np.array([0 if part.points is None else len(part.points) for part in parts], dtype=np.int64)
+    # Points are stored in the array of their dtype, the start of a part is counted in its array
+    point_starts = np.zeros(len(parts), dtype=np.int64)
+    point_arrays = dict()
+    for flag, dtype in ((INT, np.int64), (FLOAT, np.float64)):
+        is_flagged = point_flags == flag
+        point_starts[is_flagged] = np.cumsum(point_counts[is_flagged]) - point_counts[is_flagged]
+        flagged_points = [part.points for part, is_part_flagged in zip(parts, is_flagged) if is_part_flagged]
+        point_arrays[flag] = np.concatenate(flagged_points).astype(dtype).reshape(-1, 2) if flagged_points else np.zeros((0, 2), dtype=dtype)
+
+    reference_flags = np.array([get_dtype_flag(part.reference) for part in parts], dtype=np.int8)
+    references = np.array([(0, 0) if part.reference is None else part.reference for part in parts], dtype=np.float64).reshape(-1, 2)
+
+    arrays = {
+        'types': np.array([part.dataType.value for part in parts], dtype=np.uint8),
+        'layers': np.array(layer_indices, dtype=np.int32),
+        'nodes': np.array(nodes, dtype=np.int64),
+        # Parts without dimension offset have the integer 0, which is hashed differently
+        'dim_offsets': np.array([np.nan if isinstance(part.dimOffset, int) else part.dimOffset for part in parts], dtype=np.float64),
+        'reference_flags': reference_flags,
+        'references': references,
+        'point_flags': point_flags,
+        'point_starts': point_starts,
+        'point_counts': point_counts,
+        'points_int': point_arrays[INT],
+        'points_float': point_arrays[FLOAT],
+    }
+
+    header = {
+        'settings': constructionPlanSet.settings,
+        # Defaults (e.g. the date) are not stored, so they are the ones of the run that loads the plan
+        'meta_information': {key: value for key, value in constructionPlanSet.meta_information.items() if key not in constructionPlanSet.default_meta_keys},
+        'layer_keys': layer_keys,
+        'identifiers': [part.identifier for part in parts],
+        'labels': {i: [part.text1, part.text2] for i, part in enumerate(parts) if isinstance(part, PartLabel)},
+        'referenced_points': {layer_key: sorted(points) for layer_key, points in constructionPlanSet.get_referenced_points().items()},
+        'arrays': dict(),
+    }
+
+    # The offsets of the arrays depend on the length of the header, which contains the offsets
+    header_length = 0
+    while True:
+        offset = get_aligned(prefix.size + header_length)
+        for name, array in arrays.items():
+            header['arrays'][name] = [offset, array.dtype.str, array.shape]
+            offset = get_aligned(offset + array.nbytes)
+
+        header_bytes = json.dumps(header, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        if len(header_bytes) <= header_length:
+            break
+        header_length = len(header_bytes)
+
+    header_bytes = header_bytes.ljust(header_length)
+    with open_atomic(file_path) as f:
+        f.write(prefix.pack(magic, format_version, header_length))
+        f.write(header_bytes)
+        for name, array in arrays.items():
+            array_offset = header['arrays'][name][0]
+            f.write(b'\0'*(array_offset - f.tell()))
+            f.write(np.ascontiguousarray(array).tobytes())
+
+def get_aligned(offset:int):
+    return -(-offset // alignment) * alignment
+
+def load_arrays(buffer:mmap.mmap, header:dict) -> dict[str, np.ndarray]:
+    arrays = dict()
+    for name, (offset, dtype, shape) in header['arrays'].items():
+        count = int(np.prod(shape))
+        # Empty arrays at the end of the file start behind the mapping
+        if count == 0:
+            arrays[name] = np.zeros(shape, dtype=np.dtype(dtype))
+        else:
+            arrays[name] = np.frombuffer(buffer, dtype=np.dtype(dtype), count=count, offset=offset).reshape(shape)
+
+    return arrays
+
+def load_compiled_plan(file_path:str) -> ConstructionPlanSet:
+    with open(file_path, 'rb') as f:
+        if f.read(len(magic)) != magic:
+            raise InputError(f'{file_path} is not a compiled plan')
+        f.seek(0)
+
+        # The mapping stays valid after the file is closed, the arrays keep it alive
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    try:
+        _, version, header_length = prefix.unpack_from(buffer)
+        if version != format_version:
+            raise InputError(f'{file_path} was compiled with format version {version}, version {format_version} is supported. Compile the plan again.')
+
+        header = json.loads(bytes(buffer[prefix.size:prefix.size+header_length]).decode('utf-8'))
+        arrays = load_arrays(buffer, header)
+    except (struct.error, ValueError, KeyError, TypeError):
+        # E.g. a truncated file of an interrupted copy
+        raise InputError(f'{file_path} is not a valid compiled plan, compile the plan again')
+
+    constructionPlanSet = ConstructionPlanSet()
+    constructionPlanSet.settings = header['settings']
+    constructionPlanSet.meta_information.update(header['meta_information'])
+    constructionPlanSet.default_meta_keys.difference_update(header['meta_information'].keys())
+    constructionPlanSet.compiled_referenced_points = {layer_key: set(map(tuple, points)) for layer_key, points in header['referenced_points'].items()}
+
+    layer_keys = header['layer_keys']
+    for layer_key in layer_keys:
+        constructionPlanSet.register_layer_key(layer_key)
+
+    labels = header['labels']
+    points_by_flag = {INT: arrays['points_int'], FLOAT: arrays['points_float']}
+    # Lists of python numbers are much faster to iterate than the arrays
+    columns = zip(header['identifiers'], *map(lambda n: arrays[n].tolist(), ('types', 'layers', 'nodes', 'dim_offsets', 'reference_flags', 'point_flags', 'point_starts', 'point_counts')))
+    for i, (identifier, type_value, layer_index, node, dim_offset, reference_flag, point_flag, point_start, point_count) in enumerate(columns):
+        dataType = DataType(type_value)
+        layer = layer_keys[layer_index]
+
+        reference = None
+        if reference_flag != NONE:
+            reference = arrays['references'][i].astype(np.int64 if reference_flag == INT else np.float64)
+
+        if str(i) in labels:
+            text1, text2 = labels[str(i)]
+            part = PartLabel(identifier, dataType, layer, reference, text1, text2)
+        else:
+            points = None
+            if point_flag != NONE:
+                points = points_by_flag[point_flag][point_start:point_start+point_count]
+            part = Part(identifier, dataType, layer, '' if np.isnan(dim_offset) else dim_offset, reference, points)
+
+        constructionPlanSet.add_part(node, part)
+
+    constructionPlanSet.node_count = int(arrays['nodes'].max()) + 1 if len(arrays['nodes']) > 0 else 0
+    return constructionPlanSet
@@ -1,5 +1,34 @@
+import sys
+
+QUIET = 0
+INFO = 1
+DEBUG = 2
+
+log_level = INFO
+# Messages are written to stderr if stdout is used for the output
+is_using_stderr = False
+
+def set_log_level(level:int):
+    global log_level
+    log_level = level
+
+def use_stderr():
+    global is_using_stderr
+    is_using_stderr = True
+
+def get_stream():
+    return sys.stderr if is_using_stderr else sys.stdout
+
+def is_debug_enabled():
+    return log_level >= DEBUG
+
+def print_debug(msg):
+    if log_level >= DEBUG:
+        print(f'DEBUG: {msg}', file=get_stream())
+
 def print_info(msg):
-    print(f'INFO: {msg}')
+    if log_level >= INFO:
+        print(f'INFO: {msg}', file=get_stream())
 
 def print_error(msg):
-    print(f'ERROR: {msg}')
+    print(f'ERROR: {msg}', file=get_stream())
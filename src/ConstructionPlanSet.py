@@ -1,90 +1,391 @@
+import bisect
 from datetime import date
-import re
-from typing import List, cast
+import hashlib
+import heapq
+from typing import Iterable, List, cast
 import numpy as np
-from ConsolePrinter import print_info
+from ConsolePrinter import is_debug_enabled, print_debug
+from DependencyGraph import DependencyGraph
 from Exceptions.InputError import InputError
 from Part import Part
+from PointExpression import compile_point_expression
 from DataType import DataType
 from PartLabel import PartLabel
 
 class ConstructionPlanSet:
+    '''
+    Entries can be assigned to several layers with a list ("1-EG;2-OG1") or to all layers ("*"). Such a shared entry is
+    resolved once, its part is contained in the parts of every layer it is assigned to. The layer list is the layer key
+    of the entry. Entries reference entries with the same layer key and, if there is none with the identifier, the
+    shared entries assigned to all of their layers.
+    '''
+    all_layers = '*'
+    layer_separator = ';'
+    # Points the shapes of the types need, other types need at least one point
+    min_point_counts = {
+        DataType.OpeningArc: 3,
+        DataType.XDim: 2,
+        DataType.XDimC: 2,
+        DataType.YDim: 2,
+        DataType.YDimC: 2,
+    }
+
     def __init__(self):
         self.part_list:List[Part] = list()
         self.meta_information:dict[str, str] = {'Date': date.today().strftime("%d.%m.%Y")}
+        # Meta information not set by an entry, it is set again whenever a plan set is made
+        self.default_meta_keys:set[str] = {'Date'}
         self.settings:dict[str, str] = {'PageSize': 'A4'}
+        self.setting_lines:dict[str, int] = dict()
+
+        # Index of all parts by their layer key. Parts of a layer are kept sorted by their DataType so the writer can
+        # draw them in order.
+        self.parts_by_layer:dict[str, List[Part]] = dict()
+        self.layer_sort_keys:dict[str, List[tuple[int, int]]] = dict()
+        self.layer_hashes:dict[str, str] = dict()
+        self.parts_by_key:dict[tuple[str, str], Part] = dict()
+        self.ambiguous_keys:set[tuple[str, str]] = set()
+        self.parts_by_node:dict[int, Part] = dict()
+
+        # Entries of parts (nodes) and their references among each other
+        self.entries:dict[int, dict] = dict()
+        self.nodes_by_key:dict[tuple[str, str], List[int]] = dict()
+        self.dependency_graph = DependencyGraph()
+        self.unresolved_nodes:set[int] = set()
+        self.node_count = 0
+
+        # Layers of the layer keys of shared entries (None for all layers)
+        self.shared_layer_keys:dict[str, tuple[str, ...]] = dict()
+
+        # Absolute coordinates of already referenced points
+        self.point_cache:dict[tuple[str, str, int], tuple] = dict()
+
+        # Referenced points of compiled plans, which have parts but no entries
+        self.compiled_referenced_points:dict[str, set[tuple[str, int]]] = dict()
     
     def parse_and_calculate_point(self, expression:str, layer, reference:np.ndarray = None):
-        points = expression.split('+')
-        
-        parsed_points = []
-        
-        for point in points:
-            tokens = re.findall(r"\((.*?)\)", point)
-            
-            if (len(tokens) != 1):
-                raise ImportError(f'Unable to intepret point: {point}')
-            
-            point = tokens[0]
-            
-            if (',' in point):
-                x_str, y_str = point.split(',')
-                x, y = int(x_str), int(y_str)
-            else:
-                x, y = self.get_coordinates_of_point(point, layer)
-
-                if (reference is not None):
-                    x -= reference[0]
-                    y -= reference[1]
-            
-            parsed_points.append(tuple([x, y]))
-
-        result_x = 0
-        result_y = 0
-        for parsed_point in parsed_points:
-            result_x += parsed_point[0]
-            result_y += parsed_point[1]
-            
-        return np.array([result_x, result_y])
+        return np.array(self.parse_and_calculate_coordinates(expression, layer, reference))
+
+    def parse_and_calculate_coordinates(self, expression:str, layer, reference:np.ndarray = None):
+        point_expression = compile_point_expression(expression)
+
+        return point_expression.evaluate_coordinates(lambda identifier, idx: self.get_coordinates_of_point(identifier, idx, layer), reference)
+
+    def get_layer_key(self, layer:str) -> str:
+        '''Returns the normalized layer key of the layer column of an entry.'''
+        if ConstructionPlanSet.layer_separator not in layer:
+            return layer.strip() if layer.strip() == ConstructionPlanSet.all_layers else layer
+
+        layers = map(lambda n: n.strip(), layer.split(ConstructionPlanSet.layer_separator))
+        return ConstructionPlanSet.layer_separator.join(dict.fromkeys(filter(lambda n: n != '', layers)))
+
+    def register_layer_key(self, layer_key:str):
+        if layer_key == ConstructionPlanSet.all_layers:
+            self.shared_layer_keys[layer_key] = None
+        elif ConstructionPlanSet.layer_separator in layer_key:
+            layers = tuple(layer_key.split(ConstructionPlanSet.layer_separator))
+            if ConstructionPlanSet.all_layers in layers:
+                raise InputError(f'"{ConstructionPlanSet.all_layers}" can not be combined with other layers')
+            self.shared_layer_keys[layer_key] = layers
+
+    def normalize_entry(self, date):
+        layer_key = self.get_layer_key(date['Layer'])
+        if layer_key == date['Layer']:
+            return date
+        return {**date, 'Layer': layer_key}
 
     def add_data(self, date):
-        print_info(f'Adding data: {date}')
+        if is_debug_enabled():
+            print_debug(f'Adding data: {date}')
 
+        date = self.normalize_entry(date)
         identifier: str = date['Identifier']
         layer: str = date['Layer']
-        dimOffset: str = date['DimOffset']
-        reference_expression: str = date['Reference']
+        payload = date['Payload']
 
         try:
-            dataType: DataType = DataType[date['Type']]
+            dataType = self.get_data_type(date)
+            if dataType in (DataType.MetaInformation, DataType.Settings):
+                self.check_payload_length(payload, 1)
+        except InputError as e:
+            raise self.make_data_error(date, e)
+
+        match dataType:
+            case DataType.MetaInformation:
+                self.meta_information[identifier] = payload[0]
+                self.default_meta_keys.discard(identifier)
+            case DataType.Settings:
+                self.settings[identifier] = payload[0]
+                if 'Line' in date:
+                    self.setting_lines[identifier] = date['Line']
+            case _:
+                # Parts are only registered here and created by resolve(), so they can reference parts of later rows
+                try:
+                    self.register_layer_key(layer)
+                except InputError as e:
+                    raise self.make_data_error(date, e)
+
+                node = self.node_count
+                self.node_count += 1
+
+                key = (layer, identifier)
+                if key in self.nodes_by_key:
+                    # Duplicates are only an error if the part is referenced (e.g. several dimensions may share one identifier)
+                    self.ambiguous_keys.add(key)
+                self.nodes_by_key.setdefault(key, list()).append(node)
+
+                self.entries[node] = date
+                self.dependency_graph.add_node(node)
+                self.unresolved_nodes.add(node)
+
+    def update_data(self, date) -> set[str]:
+        '''
+        Replaces the entry with the same identifier and layer and recalculates it and all parts depending on it.
+        Returns the layer keys whose parts have changed.
+        '''
+        date = self.normalize_entry(date)
+        key = (date['Layer'], date['Identifier'])
+        nodes = self.nodes_by_key.get(key)
+
+        if self.get_data_type(date) in (DataType.MetaInformation, DataType.Settings) or nodes is None:
+            self.add_data(date)
+            self.resolve()
+            return {date['Layer']} if nodes is None else set()
+
+        if key in self.ambiguous_keys:
+            raise InputError(f'There are more then one {Part.__name__} with identifier "{date['Identifier']}" in layer "{date['Layer']}"')
+
+        node = nodes[0]
+        self.entries[node] = date
+
+        # Entries which failed before are retried, the edit might have fixed them
+        downstream = self.dependency_graph.get_downstream([node, *self.unresolved_nodes])
+        self.unresolved_nodes = set()
+        for downstream_node in downstream:
+            self.remove_part(downstream_node)
+
+        self.resolve_nodes(downstream)
+
+        return set(map(lambda n: self.entries[n]['Layer'], downstream))
+
+    def update_lines(self, entries:Iterable[dict]):
+        '''
+        Sets the line numbers used in error messages to the ones of the entries, e.g. after rows were inserted above
+        them. The entries must have the identifiers, layers and types of the added entries in the same order, the parts
+        are not recalculated.
+        '''
+        occurrences = dict()
+        for date in entries:
+            if 'Line' not in date:
+                continue
+
+            date = self.normalize_entry(date)
+            key = (date['Layer'], date['Identifier'])
+            match self.get_data_type(date):
+                case DataType.MetaInformation:
+                    pass
+                case DataType.Settings:
+                    self.setting_lines[date['Identifier']] = date['Line']
+                case _:
+                    # Entries with the same key are added in the order of the rows
+                    occurrence = occurrences.get(key, 0)
+                    occurrences[key] = occurrence + 1
+                    node = self.nodes_by_key[key][occurrence]
+                    if self.entries[node].get('Line') != date['Line']:
+                        self.entries[node] = {**self.entries[node], 'Line': date['Line']}
+
+    def resolve(self):
+        '''Creates the parts of all added entries in the order of their references.'''
+        errors = self.try_resolve()
+        if errors:
+            raise InputError('\n'.join(map(str, errors)))
+
+    def resolve_nodes(self, nodes):
+        errors = self.try_resolve_nodes(nodes)
+        if errors:
+            raise InputError('\n'.join(map(str, errors)))
+
+    def try_resolve(self) -> List[InputError]:
+        '''Creates the parts of all added entries which can be resolved and returns the errors of the others.'''
+        nodes = self.unresolved_nodes
+        self.unresolved_nodes = set()
+
+        return self.try_resolve_nodes(nodes)
+
+    def try_resolve_nodes(self, nodes) -> List[InputError]:
+        errors = list()
+        failed_nodes = set()
+
+        for node in nodes:
+            try:
+                dependencies = self.get_dependency_nodes(self.entries[node])
+            except InputError as e:
+                errors.append(self.make_data_error(self.entries[node], e))
+                failed_nodes.add(node)
+                dependencies = set()
+
+            self.dependency_graph.set_dependencies(node, dependencies)
+
+        order, cyclic_nodes = self.dependency_graph.get_topological_order(nodes)
+        failed_nodes.update(cyclic_nodes)
+
+        for cycle in self.dependency_graph.find_cycles(cyclic_nodes):
+            chain = ' -> '.join(map(lambda n: self.entries[n]['Identifier'], cycle))
+            error = InputError(f'Circular reference in layer "{self.entries[cycle[0]]['Layer']}": {chain}')
+            errors.append(self.make_data_error(self.entries[cycle[0]], error))
+
+        for node in order:
+            if node in failed_nodes:
+                continue
+
+            # Errors of referenced entries are reported once, dependent entries are skipped silently
+            if not self.dependency_graph.get_dependencies(node).isdisjoint(failed_nodes):
+                failed_nodes.add(node)
+                continue
+
+            try:
+                self.add_part(node, self.make_part(self.entries[node]))
+            except InputError as e:
+                errors.append(self.make_data_error(self.entries[node], e))
+                failed_nodes.add(node)
+
+        self.unresolved_nodes.update(failed_nodes)
+
+        return errors
+
+    def make_data_error(self, date, error:InputError):
+        location = f'{date['Identifier']} ({date['Layer']})'
+        if 'Line' in date:
+            location = f'line {date['Line']} - {location}'
+
+        return InputError(f'{location}: {error}', date.get('Line'))
+
+    def get_data_type(self, date) -> DataType:
+        try:
+            return DataType[date['Type']]
         except KeyError:
             raise InputError(f'Unknown Type: {date['Type']}')
 
+    def get_point_expressions(self, date) -> List[str]:
+        expressions = [date['Reference']]
+        if self.get_data_type(date) is not DataType.Label:
+            expressions.extend(date['Payload'])
+
+        return list(filter(lambda n: n != '', expressions))
+
+    def get_dependency_nodes(self, date) -> set[int]:
+        dependencies = set()
+        for expression in self.get_point_expressions(date):
+            for _, identifier, _ in compile_point_expression(expression).references:
+                # Unknown identifiers are reported when the part is created
+                for layer_key in self.get_referenced_layer_keys(identifier, date['Layer']):
+                    dependencies.update(self.nodes_by_key[(layer_key, identifier)])
+
+        return dependencies
+
+    def get_referenced_layer_keys(self, identifier, layer) -> List[str]:
+        '''Returns the layer keys of the entries an entry of the layer (key) references by the identifier.'''
+        if (layer, identifier) in self.nodes_by_key:
+            return [layer]
+
+        return list(filter(lambda n: (n, identifier) in self.nodes_by_key, self.get_shared_layer_keys(layer)))
+
+    def get_shared_layer_keys(self, layer) -> List[str]:
+        '''Returns the layer keys of the shared entries assigned to the layer (key), except the layer key itself.'''
+        if layer in self.shared_layer_keys:
+            layers = self.shared_layer_keys[layer]
+            if layers is None:
+                return []
+            return [layer_key for layer_key, shared_layers in self.shared_layer_keys.items()
+                    if layer_key != layer and (shared_layers is None or set(layers).issubset(shared_layers))]
+
+        return [layer_key for layer_key, shared_layers in self.shared_layer_keys.items() if shared_layers is None or layer in shared_layers]
+
+    def get_referenced_points(self) -> dict[str, set[tuple[str, int]]]:
+        '''Returns the points (identifier, index) referenced by any entry per layer key of the referenced entry.'''
+        referenced_points:dict[str, set[tuple[str, int]]] = {layer_key: set(points) for layer_key, points in self.compiled_referenced_points.items()}
+        for date in self.entries.values():
+            for expression in self.get_point_expressions(date):
+                for _, identifier, idx in compile_point_expression(expression).references:
+                    for layer_key in self.get_referenced_layer_keys(identifier, date['Layer']):
+                        referenced_points.setdefault(layer_key, set()).add((identifier, idx))
+
+        return referenced_points
+
+    def make_part(self, date) -> Part:
+        identifier: str = date['Identifier']
+        layer: str = date['Layer']
+        dimOffset: str = date['DimOffset']
+        reference_expression: str = date['Reference']
+        dataType = self.get_data_type(date)
         payload = date['Payload']
-        
+
         reference:np.ndarray = None
         if reference_expression != '':
             reference = self.parse_and_calculate_point(reference_expression, layer)
 
         match dataType:
-            case DataType.MetaInformation:
-                self.meta_information[identifier] = payload[0]
-            case DataType.Settings:
-                self.settings[identifier] = payload[0]
             case DataType.Label:
                 self.check_payload_length(payload, 1)
                 text1 = payload[0]
                 text2 = '' if len(payload) <= 1 else payload[1]
-                self.part_list.append(PartLabel(identifier, dataType, layer, reference, text1, text2))
+                return PartLabel(identifier, dataType, layer, reference, text1, text2)
             case _:
+                self.check_payload_length(payload, ConstructionPlanSet.min_point_counts.get(dataType, 1))
                 payload_contains_relative_points:bool = dataType not in (DataType.XDim, DataType.XDimC, DataType.YDim, DataType.YDimC)
                 
                 calculation_reference = None
                 if payload_contains_relative_points:
                     calculation_reference = reference
                 
-                points = list(map(lambda n: self.parse_and_calculate_point(n, layer, calculation_reference),payload))
-                self.part_list.append(Part(identifier, dataType, layer, dimOffset, reference, points))
+                # The coordinates are collected as tuples and converted to one (N,2) array
+                points = np.array(list(map(lambda n: self.parse_and_calculate_coordinates(n, layer, calculation_reference), payload)))
+                return Part(identifier, dataType, layer, dimOffset, reference, points)
+
+    def add_part(self, node, part:Part):
+        self.part_list.append(part)
+        self.parts_by_node[node] = part
+        self.parts_by_key[(part.layer, part.identifier)] = part
+
+        # Parts of the same type keep the order of their entries, also when they are recalculated
+        sort_key = (part.dataType.value, node)
+        layer_sort_keys = self.layer_sort_keys.setdefault(part.layer, list())
+        idx = bisect.bisect_right(layer_sort_keys, sort_key)
+        layer_sort_keys.insert(idx, sort_key)
+        self.parts_by_layer.setdefault(part.layer, list()).insert(idx, part)
+        self.invalidate_layer_hashes(part.layer)
+
+    def remove_part(self, node):
+        part = self.parts_by_node.pop(node, None)
+        if part is None:
+            return
+
+        self.part_list.remove(part)
+
+        layer_sort_keys = self.layer_sort_keys[part.layer]
+        idx = bisect.bisect_left(layer_sort_keys, (part.dataType.value, node))
+        del layer_sort_keys[idx]
+        del self.parts_by_layer[part.layer][idx]
+        self.invalidate_layer_hashes(part.layer)
+        if not layer_sort_keys:
+            del self.parts_by_layer[part.layer]
+            del self.layer_sort_keys[part.layer]
+
+        key = (part.layer, part.identifier)
+        if self.parts_by_key.get(key) is part:
+            del self.parts_by_key[key]
+
+        for idx in range(0, 0 if part.points is None else len(part.points)):
+            self.point_cache.pop((part.layer, part.identifier, idx), None)
+
+    def invalidate_layer_hashes(self, layer_key):
+        if layer_key not in self.shared_layer_keys:
+            self.layer_hashes.pop(layer_key, None)
+        elif self.shared_layer_keys[layer_key] is None:
+            self.layer_hashes.clear()
+        else:
+            for layer in self.shared_layer_keys[layer_key]:
+                self.layer_hashes.pop(layer, None)
 
     def check_payload_length(self, payload, min_length):
         if len(payload) < min_length:
@@ -92,34 +393,66 @@ class ConstructionPlanSet:
 
 
     def get_part(self, identifier, layer):
-        parts = list(filter(lambda n: n.identifier == identifier and n.layer == layer, self.part_list))
-        if (len(parts) > 1):
+        layer_keys = self.get_referenced_layer_keys(identifier, layer)
+        if len(layer_keys) > 1 or (layer_keys and (layer_keys[0], identifier) in self.ambiguous_keys):
             raise InputError(f'There are more then one {Part.__name__} with identifier "{identifier}" in layer "{layer}"')
-        elif (len(parts) < 1):
+
+        part = self.parts_by_key.get((layer_keys[0], identifier)) if layer_keys else None
+        if part is None:
             raise InputError(f'Cant find any {Part.__name__} with identifier "{identifier}" in layer "{layer}"')
-        else:
-            return parts[0]
 
+        return part
 
-    def get_coordinates_of_point(self, expression, layer):
-        tokens = re.findall(r"(.+)-(\d+)", expression)
-        identifier = tokens[0][0]
-        idx = int(tokens[0][1])-1
 
+    def get_coordinates_of_point(self, identifier, idx, layer):
         referenced_part:Part = self.get_part(identifier, layer)
 
-        if (idx < 0):
-            raise InputError(f"Error parsing {expression}: Referencing index must be greater then 0")
-        
-        referenced_point = referenced_part.points[idx]
+        # Points of shared parts are cached once for all layers referencing them
+        key = (referenced_part.layer, identifier, idx)
+        coordinates = self.point_cache.get(key)
+        if coordinates is not None:
+            return coordinates
+
+        if (referenced_part.points is None or idx >= len(referenced_part.points)):
+            raise InputError(f'Error parsing ({identifier}-{idx+1}): {Part.__name__} "{identifier}" in layer "{layer}" has no point {idx+1}')
 
-        x, y = referenced_point[0]+referenced_part.reference[0], referenced_point[1]+referenced_part.reference[1]
+        x, y = referenced_part.points[idx]
+        if referenced_part.reference is not None:
+            x, y = x+referenced_part.reference[0], y+referenced_part.reference[1]
 
-        return x, y
+        coordinates = (x, y)
+        self.point_cache[key] = coordinates
+
+        return coordinates
 
     def get_parts_in_layer(self, layer) -> List[Part]:
-        return list(filter(lambda n: n.layer == layer, self.part_list))
+        '''Returns the parts of the layer including the shared parts assigned to it, sorted by their DataType.'''
+        layer_keys = [layer_key for layer_key in self.get_shared_layer_keys(layer) if layer_key in self.parts_by_layer]
+        if not layer_keys:
+            return self.parts_by_layer.get(layer, list())
+
+        layer_keys.append(layer)
+        sorted_parts = map(lambda n: zip(self.layer_sort_keys.get(n, ()), self.parts_by_layer.get(n, ())), layer_keys)
+        return list(map(lambda n: n[1], heapq.merge(*sorted_parts, key=lambda n: n[0])))
     
     def get_layers(self):
-        return set(map(lambda n: n.layer, self.part_list))
+        '''Returns all layers with parts. Entries assigned to all layers do not add a layer.'''
+        layers = set(filter(lambda n: n not in self.shared_layer_keys, self.parts_by_layer.keys()))
+        for layer_key in self.parts_by_layer.keys():
+            if self.shared_layer_keys.get(layer_key) is not None:
+                layers.update(self.shared_layer_keys[layer_key])
+
+        return layers
+
+    def get_layer_hash(self, layer) -> str:
+        '''Returns a hash of the content of all parts in the layer. It changes whenever the drawing of the layer changes.'''
+        layer_hash = self.layer_hashes.get(layer)
+        if layer_hash is None:
+            hash_object = hashlib.sha256()
+            for part in self.get_parts_in_layer(layer):
+                part.hash_content(hash_object)
+
+            layer_hash = hash_object.hexdigest()
+            self.layer_hashes[layer] = layer_hash
 
+        return layer_hash
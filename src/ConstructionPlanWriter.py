@@ -1,44 +1,75 @@
 from abc import ABC, abstractmethod
-from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+import copy
+import hashlib
+from io import BytesIO, StringIO, TextIOWrapper
+from itertools import repeat
+import json
 import math
-from reportlab.graphics import renderPDF
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4, A3
-from svglib.svglib import svg2rlg
-from typing import Dict, List, cast
+from typing import BinaryIO, Callable, Dict, List, TextIO, cast
 import numpy as np
 from ConstructionPlanSet import ConstructionPlanSet
 from Exceptions.InputError import InputError
 from Exceptions.NotImplementedException import NotImplementedException
+from FileHelper import open_atomic
+from GeometrySimplifier import GeometrySimplifier
+from PageCache import PageCache
+from PagePipeline import PagePipeline
 from Part import Part
 from DataType import DataType
 from PartLabel import PartLabel
-import SVGHelper
+from PlanRenderer import PlanRenderer
+from Profiler import Profiler
+from RecordingRenderer import RecordingRenderer
+from SpatialGrid import SpatialGrid
+from SVGRenderer import SVGRenderer
 from VersionHelper import get_version, version_to_str
 
 
 class ConstructionPlanWriter:
+    '''
+    Writes the pages of all layers. reportlab and svglib are imported when they are needed, so runs that only write
+    svg files (or fail before writing) do not pay for importing them.
+    '''
     plan_margin = 50
-
-    def __init__(self, file_path_base, constructionPlanSet:ConstructionPlanSet, debug_mode):
+    info_box_height = 50
+    backends = ('reportlab', 'svg')
+    max_precision = 10
+    # Width and height in cm
+    page_sizes = {'A4': (21, 29.7), 'A3': (29.7, 42)}
+    # Increased when the content of cached pages changes, so pages of older runs are not used
+    page_format = 1
+
+    def __init__(self, file_path_base, constructionPlanSet:ConstructionPlanSet, debug_mode, backend:str = 'reportlab', profiler:Profiler = None, tile_overlap:float = None, simplifier:GeometrySimplifier = None):
+        '''
+        Layers that do not fit on one page are split into tiles overlapping by tile_overlap (cm on paper).
+        If tile_overlap is None, every layer is scaled to one page.
+        Paths are drawn with the points of the point masks of the simplifier (if given).
+        '''
         self.file_path_base = file_path_base
         self.constructionPlanSet = constructionPlanSet
         self.debug_mode = debug_mode
+        self.profiler = profiler or Profiler()
+        self.tile_overlap = tile_overlap
+        self.simplifier = simplifier
+
+        if backend not in ConstructionPlanWriter.backends:
+            raise ValueError(f'Backend {backend} is not supported')
+        self.backend = backend
+
+        setting_errors = ConstructionPlanWriter.get_setting_errors(constructionPlanSet.settings)
+        if setting_errors:
+            raise InputError('\n'.join(map(str, setting_errors.values())))
+
         self.scale_divisor = int(constructionPlanSet.settings['ScaleDivisor'])
 
-        match constructionPlanSet.settings['PageSize']:
-            case 'A4':
-                self.pagesize = A4
-                self.pdf_width, self.pdf_height = 21, 29.7
-            case 'A3':
-                self.pagesize = A3
-                self.pdf_width, self.pdf_height = 29.7, 42
-            case _:
-                raise ValueError(f'Page size {constructionPlanSet.settings['PageSize']} is not supported')
+        self.page_size = constructionPlanSet.settings['PageSize']
+        self.pdf_width, self.pdf_height = ConstructionPlanWriter.page_sizes[self.page_size]
         
         self.svg_width = ConstructionPlanWriter.cm_to_dots(self.pdf_width)
         self.svg_height = ConstructionPlanWriter.cm_to_dots(self.pdf_height)
 
+        self.precision = ConstructionPlanWriter.get_precision(constructionPlanSet.settings)
 
     def cm_to_dots(value):
         dpi = 72
@@ -46,99 +77,378 @@ class ConstructionPlanWriter:
 
         return value*dpi/cm_per_inch
 
-    def write(self, is_savig_svg:bool):
-        cps = self.constructionPlanSet
-
-        layers = sorted(cps.get_layers())
-
-        cps.meta_information['Massstab'] = f'1 : {self.scale_divisor}'
+    def get_setting_errors(settings:dict[str, str]) -> dict[str, InputError]:
+        '''Returns the errors of the settings by the name of the setting. Nothing is drawn, so this is fast.'''
+        errors = dict()
+
+        if settings.get('PageSize') not in ConstructionPlanWriter.page_sizes:
+            errors['PageSize'] = InputError(f'Page size {settings.get('PageSize')} is not supported, use {' or '.join(ConstructionPlanWriter.page_sizes)}')
+
+        for name, convert in (('ScaleDivisor', int), ('CompassRotation', float)):
+            if name not in settings:
+                errors[name] = InputError(f'The setting "{name}" is missing')
+                continue
+            try:
+                value = convert(settings[name])
+            except ValueError:
+                errors[name] = InputError(f'The setting "{name}" must be a {'whole ' if convert is int else ''}number')
+                continue
+            if name == 'ScaleDivisor' and value <= 0:
+                errors[name] = InputError(f'The setting "{name}" must be positive')
+
+        try:
+            ConstructionPlanWriter.get_precision(settings)
+        except InputError as e:
+            errors['Precision'] = e
+
+        return errors
+
+    def get_precision(settings:dict[str, str]):
+        '''Returns the decimal places of the coordinates in svg files (setting "Precision") or None for full precision.'''
+        precision = settings.get('Precision')
+        if precision is None or precision == '':
+            return None
+
+        try:
+            precision = int(precision)
+        except ValueError:
+            precision = -1
+        if not 0 <= precision <= ConstructionPlanWriter.max_precision:
+            raise InputError(f'The setting "Precision" must be a whole number from 0 to {ConstructionPlanWriter.max_precision}')
+
+        return precision
+
+    def get_pagesize(self):
+        from reportlab.lib.pagesizes import A4, A3
+        return A4 if self.page_size == 'A4' else A3
+
+    def write_svg_files(self, jobs:int = 1):
+        '''Writes only the svg files. Neither reportlab nor svglib is needed for this.'''
+        layers = sorted(self.constructionPlanSet.get_layers())
+
+        if jobs <= 1 or len(layers) <= 1:
+            for layer in layers:
+                self.write_svg_files_of_layer(layer)
+            return
+
+        with ProcessPoolExecutor(max_workers=min(jobs, len(layers)), initializer=init_worker, initargs=(self,)) as executor:
+            list(executor.map(write_svg_files_of_layer_in_worker, layers))
+
+    def write_svg_files_of_layer(self, layer):
+        layer_body, pages = self.get_layer_pages(layer)
+        for page_name, tile in pages:
+            self.write_svg_file(page_name, layer, layer_body, tile)
+
+    def write_svg_file(self, page_name, layer, layer_body:'LayerBody', tile:'PageTile'):
+        with self.profiler.stage(f'svg build {layer}'):
+            # The document is streamed into the file, so it is never held in memory as a whole
+            with open(self.get_svg_file_path(page_name), 'w', encoding='utf-8', newline='') as svg_file:
+                self.write_svg(svg_file, layer, layer_body, tile)
+
+    def write(self, is_savig_svg:bool, jobs:int = 1, page_cache:PageCache = None, pdf_stream:BinaryIO = None, is_compact_pdf:bool = False, is_pipelined:bool = False):
+        '''
+        Writes the pdf (and svg) file(s). If a page cache is given, pages of layers whose page key is in the cache are
+        reused instead of made again. The pdf is written to pdf_stream if given, otherwise it replaces the pdf file
+        when it is complete. Compact pdfs have binary instead of ASCII85 encoded streams.
+        Pipelined writes make the next page and save the svg files in background threads while a page is drawn (only
+        used without process pool, i.e. jobs <= 1).
+        Returns the layers whose pages were made.
+        '''
+        if pdf_stream is not None:
+            return self.write_pdf(pdf_stream, is_savig_svg, jobs, page_cache, is_compact_pdf, is_pipelined)
+
+        with open_atomic(f'{self.file_path_base}.pdf') as pdf_file:
+            return self.write_pdf(pdf_file, is_savig_svg, jobs, page_cache, is_compact_pdf, is_pipelined)
+
+    def write_pdf(self, pdf_stream:BinaryIO, is_savig_svg:bool, jobs:int, page_cache:PageCache, is_compact_pdf:bool, is_pipelined:bool):
+        layers = sorted(self.constructionPlanSet.get_layers())
+
+        page_keys = dict()
+        cached_pages = dict()
+        if page_cache is not None:
+            with self.profiler.stage('page cache'):
+                for layer in layers:
+                    page_keys[layer] = self.get_page_key(layer, is_savig_svg)
+                    cached_page = page_cache.get(page_keys[layer])
+                    if cached_page is not None:
+                        cached_pages[layer] = cached_page
+
+        missing_layers = list(filter(lambda n: n not in cached_pages, layers))
+
+        made_pages = self.make_pages(missing_layers, is_savig_svg, jobs, is_pipelined)
         
-        pdf_buffer = BytesIO()
-        pdf_canvas = canvas.Canvas(pdf_buffer, pagesize=self.pagesize)
+        from reportlab import rl_config
+        from reportlab.pdfgen import canvas
+        from PDFRenderer import PDFRenderer
+
+        # The document is written to the stream when it is saved. Invariant documents have no creation date and
+        # random id, so the same plan always results in the same file.
+        pdf_canvas = canvas.Canvas(pdf_stream, pagesize=self.get_pagesize(), invariant=1)
+        pdf_renderer = PDFRenderer(pdf_canvas)
+
+        # reportlab reads the stream encoding from its global configuration while drawing and saving
+        use_a85 = rl_config.useA85
+        if is_compact_pdf:
+            rl_config.useA85 = 0
+        try:
+            self.draw_pages(pdf_renderer, layers, cached_pages, made_pages, page_keys, page_cache, is_savig_svg)
+
+            with self.profiler.stage('pdf write'):
+                pdf_canvas.save()
+        finally:
+            rl_config.useA85 = use_a85
+
+        if page_cache is not None:
+            with self.profiler.stage('page cache'):
+                page_cache.finish(page_keys.values())
+
+        return missing_layers
+
+    def draw_pages(self, pdf_renderer:'PDFRenderer', layers:List[str], cached_pages:dict, made_pages, page_keys:dict, page_cache:PageCache, is_savig_svg:bool):
         for layer in layers:
-            cps.meta_information['Ebene'] = layer
-
-            svg_content = self.make_svg_content(cps, layer)
-            
-            svg_buffer = BytesIO(svg_content.encode('utf-8'))
-            
-            drawing = svg2rlg(svg_buffer)
-            renderPDF.draw(drawing, pdf_canvas, 0, 0)
-            pdf_canvas.showPage()
+            if layer in cached_pages:
+                svg_contents, page = cached_pages[layer]
+                if is_savig_svg:
+                    for page_name, svg_content in svg_contents:
+                        self.save_svg(page_name, svg_content)
+            else:
+                # The svg files were already written (or queued in a pipeline) when the page was made.
+                # With a process pool or a pipeline this is the time spent waiting for the next page.
+                with self.profiler.stage('make pages'):
+                    page_names, page, svg_contents = next(made_pages)
+                if page_cache is not None:
+                    with self.profiler.stage('page cache'):
+                        if is_savig_svg and svg_contents is None:
+                            svg_contents = list(map(lambda n: (n, self.load_svg(n)), page_names))
+                        page_cache.put(page_keys[layer], svg_contents, page)
+
+            with self.profiler.stage(f'pdf draw {layer}'):
+                self.draw_page(pdf_renderer, page)
+
+    def get_page_key(self, layer, is_savig_svg:bool) -> str:
+        '''Hash of everything the page of the layer depends on.'''
+        content = json.dumps([
+            self.constructionPlanSet.get_layer_hash(layer),
+            self.constructionPlanSet.settings,
+            self.get_meta_information(layer),
+            self.debug_mode,
+            self.backend,
+            is_savig_svg,
+            self.tile_overlap,
+            None if self.simplifier is None else self.simplifier.tolerance,
+            version_to_str(*get_version()),
+            ConstructionPlanWriter.page_format,
+            self.get_library_versions()])
+
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def get_library_versions(self) -> List[str]:
+        '''Versions of the libraries the pages are made with, cache directories can be shared by several installations.'''
+        # reportlab is needed for the pdf anyway, svglib only makes the pages of the svg backend
+        import reportlab
+        versions = [reportlab.Version]
+        if self.backend == 'svg':
+            from svglib import svglib
+            versions.append(svglib.__version__)
+
+        return versions
+
+    def make_pages(self, layers:List[str], is_savig_svg:bool, jobs:int, is_pipelined:bool = False):
+        '''
+        Yields the result of make_page for every layer in the given order. Pages are made by a process pool if jobs > 1
+        or by a pipeline of background threads if is_pipelined.
+        '''
+        if is_pipelined and jobs <= 1 and len(layers) > 1:
+            # The stages of the background thread can not be reported, they are part of the "make pages" stage
+            producer = copy.copy(self)
+            producer.profiler = Profiler()
+            pagePipeline = PagePipeline(lambda layer, save_svg: producer.make_page(layer, is_savig_svg, save_svg), self.save_svg)
+            yield from pagePipeline.run(layers)
+            return
+
+        if jobs <= 1 or len(layers) <= 1:
+            for layer in layers:
+                yield self.make_page(layer, is_savig_svg)
+            return
+
+        with ProcessPoolExecutor(max_workers=min(jobs, len(layers)), initializer=init_worker, initargs=(self,)) as executor:
+            yield from executor.map(make_page_in_worker, layers, repeat(is_savig_svg))
+
+    def make_page(self, layer, is_savig_svg:bool, save_svg:Callable[[str, str], None] = None):
+        '''
+        Writes the svg files (if needed) and returns the names of the pages of the layer (one per tile), the page and
+        the svg contents (page name, content) if they were kept in memory, otherwise None.
+        If save_svg is given, the svg documents are built in memory and handed to save_svg instead of being written.
+        The page is a list of reportlab drawings for the svg backend and a recording of the drawing calls for the
+        reportlab backend. Both can be sent to other processes.
+        '''
+        layer_body, pages = self.get_layer_pages(layer)
+        page_names = list(map(lambda n: n[0], pages))
+
+        svg_contents = None
+        if is_savig_svg and save_svg is not None:
+            svg_contents = list()
+            for page_name, tile in pages:
+                with self.profiler.stage(f'svg build {layer}'):
+                    svg_stream = StringIO(newline='')
+                    self.write_svg(svg_stream, layer, layer_body, tile)
+                svg_contents.append((page_name, svg_stream.getvalue()))
+                save_svg(page_name, svg_contents[-1][1])
+        elif is_savig_svg:
+            for page_name, tile in pages:
+                self.write_svg_file(page_name, layer, layer_body, tile)
+
+        if self.backend != 'svg':
+            with self.profiler.stage(f'record {layer}'):
+                page = RecordingRenderer()
+                for _, tile in pages:
+                    self.render_page(page, layer, layer_body, tile)
+            return page_names, page, svg_contents
+
+        from svglib.svglib import svg2rlg
+        page = list()
+        for i, (page_name, tile) in enumerate(pages):
+            if svg_contents is not None:
+                with self.profiler.stage(f'svg2rlg {layer}'):
+                    page.append(svg2rlg(BytesIO(svg_contents[i][1].encode('utf-8'))))
+                continue
 
             if is_savig_svg:
-                self.save_svg(layer, svg_buffer)            
+                with self.profiler.stage(f'svg2rlg {layer}'):
+                    with open(self.get_svg_file_path(page_name), 'rb') as svg_file:
+                        page.append(svg2rlg(svg_file))
+                continue
+
+            with self.profiler.stage(f'svg build {layer}'):
+                svg_buffer = BytesIO()
+                svg_stream = TextIOWrapper(svg_buffer, encoding='utf-8', newline='')
+                self.write_svg(svg_stream, layer, layer_body, tile)
+                # Flushes the stream without closing the buffer
+                svg_stream.detach()
+
+            with self.profiler.stage(f'svg2rlg {layer}'):
+                svg_buffer.seek(0)
+                page.append(svg2rlg(svg_buffer))
+
+        return page_names, page, svg_contents
+
+    def draw_page(self, pdf_renderer:PlanRenderer, page):
+        if self.backend == 'svg':
+            from reportlab.graphics import renderPDF
+            for drawing in page:
+                renderPDF.draw(drawing, pdf_renderer.canvas, 0, 0)
+                pdf_renderer.canvas.showPage()
+        else:
+            page.replay(pdf_renderer)
+
+    def get_svg_file_path(self, page_name):
+        return f'{self.file_path_base}_{page_name}.svg'
+
+    def save_svg(self, page_name, svg_content:str):
+        with open(self.get_svg_file_path(page_name), 'w', encoding='utf-8', newline='') as svg_file:
+            svg_file.write(svg_content)
+
+    def load_svg(self, page_name) -> str:
+        with open(self.get_svg_file_path(page_name), 'rb') as svg_file:
+            return svg_file.read().decode('utf-8')
+
+    def write_svg(self, stream:TextIO, layer, layer_body:'LayerBody', tile:'PageTile'):
+        svg_renderer = SVGRenderer(stream, self.precision)
+        self.render_page(svg_renderer, layer, layer_body, tile)
+
+    def get_layer_pages(self, layer):
+        '''
+        Returns the body of the layer and its pages as (page name, tile). The tile is None if the layer is drawn on one
+        page, the page name is the layer then.
+        '''
+        with self.profiler.stage(f'layer body {layer}'):
+            layer_body = self.make_layer_body(layer)
+
+        tiles = None
+        if self.tile_overlap is not None:
+            with self.profiler.stage(f'tiles {layer}'):
+                tiles = self.make_tiles(layer_body)
+
+        if tiles is None:
+            return layer_body, [(layer, None)]
+        return layer_body, list(map(lambda n: (f'{layer}_{n.name}', n), tiles))
+
+    def make_tiles(self, layer_body:'LayerBody') -> List['PageTile']:
+        '''
+        Returns the tiles the body is split into at the scale of the plan or None if it fits on one page.
+        Tiles are ordered by rows from top to bottom and overlap by tile_overlap.
+        '''
+        # The tile label is an additional meta information
+        meta_information_height = self.get_meta_information_height(len(self.get_meta_information(''))+1)
+        viewport_width = self.svg_width - 2*self.plan_margin
+        viewport_height = self.svg_height - 2*self.plan_margin - meta_information_height
+
+        overlap = ConstructionPlanWriter.cm_to_dots(self.tile_overlap)
+        if overlap < 0 or overlap >= min(viewport_width, viewport_height):
+            raise InputError(f'Tile overlap must be between 0 and {min(viewport_width, viewport_height)*2.54/72:.1f} cm')
+
+        x_min, x_max, y_min, y_max = layer_body.get_extent()
+        width, height = x_max - x_min, y_max - y_min
+        if width <= viewport_width and height <= viewport_height:
+            return None
+
+        step_x = viewport_width - overlap
+        step_y = viewport_height - overlap
+        cols = max(1, math.ceil((width - overlap)/step_x))
+        rows = max(1, math.ceil((height - overlap)/step_y))
+
+        # The grid of tiles is centered on the body
+        x_start = x_min - (cols*step_x + overlap - width)/2
+        y_start = y_min - (rows*step_y + overlap - height)/2
+
+        layer_body.make_index(max(step_x, step_y))
+
+        tiles = list()
+        for row in range(rows):
+            for col in range(cols):
+                name = f'{row+1}-{col+1}'
+                tiles.append(PageTile(name, f'{name} ({rows}x{cols})', x_start + col*step_x, y_start + row*step_y, viewport_width, viewport_height, self.plan_margin, self.plan_margin))
+        return tiles
+
+    def get_meta_information(self, layer) -> dict[str, str]:
+        meta_information = dict(self.constructionPlanSet.meta_information)
+        meta_information['Massstab'] = f'1 : {self.scale_divisor}'
+        meta_information['Ebene'] = layer
+        return meta_information
+
+    def render_page(self, renderer:PlanRenderer, layer, layer_body:'LayerBody', tile:'PageTile' = None):
+        cps = self.constructionPlanSet
 
-        pdf_canvas.save()
-        
-        pdf_file_path = f'{self.file_path_base}.pdf'
-        pdf_buffer.seek(0)
-        with open(pdf_file_path, 'wb') as f:
-            f.write(pdf_buffer.read())
-
-    def save_svg(self, layer, svg_buffer):
-        svg_file_path = f'{self.file_path_base}_{layer}.svg'
-        svg_buffer.seek(0)
-            
-        with open(svg_file_path, 'wb') as svg_file:
-            svg_file.write(svg_buffer.read())
+        renderer.begin_page(self.svg_width, self.svg_height)
 
-    def make_svg_content(self, cps, layer):
-        svg_content = ''
-        svg_content += self.make_header(self.svg_width, self.svg_height)
-        plan_border_content, meta_inforamtion_height = self.make_plan_border(self.svg_width, self.svg_height, self.plan_margin, cps.meta_information)
-        svg_content += plan_border_content
+        meta_information = self.get_meta_information(layer)
+        if tile is not None:
+            meta_information['Blatt'] = tile.label
+        meta_inforamtion_height = self.make_plan_border(renderer, self.svg_width, self.svg_height, self.plan_margin, meta_information)
 
-        svg_content += self.make_compass(self.svg_width, self.svg_height, self.plan_margin, cps.settings['CompassRotation'])
+        self.make_compass(renderer, self.svg_width, self.svg_height, self.plan_margin, cps.settings['CompassRotation'])
 
         if self.debug_mode:
             anchor = np.array([self.plan_margin + 10, self.svg_height - self.plan_margin - meta_inforamtion_height - 10])
-            svg_content += self.make_axes(anchor)
-
-        body_heigth = self.svg_height - meta_inforamtion_height
-        svg_content += self.make_body(self.svg_width, body_heigth, layer)
-
-        svg_content += self.make_footer()
-        return svg_content
-
-    def make_header(self, svg_width, svg_height):
-        header_content = ''
-        header_content += f'<svg width="{svg_width}" height="{svg_height}" xmls="http://www.x3.org/2000/svg">\n'
-        header_content += '<style>\n'
-        header_content += self.make_style('plan-boarder', 'fill: none', 'stroke: black', 'stroke-width: 2px')
-        header_content += self.make_style('watermark-text', 'font-size: 8pt', 'font-family: monospace')
-        header_content += self.make_style('meta-information-key', 'font-size: 10pt', 'font-family: monospace', 'text-anchor: start')
-        header_content += self.make_style('meta-information-text', 'font-size: 10pt', 'font-family: monospace', 'font-weight: bold', 'text-anchor: middle')
-        header_content += self.make_style('label-text', 'fill: black', 'font-size: 10pt', 'font-family: monospace', 'font-weight: bold')
-        header_content += self.make_style('debug-text', 'fill: #ac9d00', 'font-size: 10pt', 'font-family: monospace', 'font-weight: bold')
-        header_content += self.make_style('debug-line', 'fill: none', 'stroke: #ac9d00', 'stroke-width: 0.5px')
-        header_content += self.make_style('dim-text', 'fill: #a10000', 'font-size: 3mm', 'font-family: monospace', 'font-weight: bold', 'text-anchor: middle')
-        header_content += self.make_style('dim-line', 'fill: none', 'stroke: black', 'stroke-width: 0.5px')
-        header_content += self.make_style('outline', 'fill: #2b2b2b', 'stroke: black', 'stroke-width: 1px')
-        header_content += self.make_style('room', 'fill: #d9d9d9', 'stroke: black', 'stroke-width: 1px')
-        header_content += self.make_style('stairs', 'fill: #b3b3b3', 'stroke: black', 'stroke-width: 1px')
-        header_content += self.make_style('steps', 'fill: none', 'stroke: black', 'stroke-width: 1px')
-        header_content += self.make_style('room-connection', 'fill: #797979', 'stroke: black', 'stroke-width: 1px')
-        header_content += self.make_style('opening-arc', 'fill: #b3b3b3', 'stroke: black', 'stroke-width: 0.5px')
-        header_content += '</style>\n'
-        return header_content
-
-    def make_plan_border(self, svg_width, svg_height, margin, meta_information:dict[str, str]):
+            self.make_axes(renderer, anchor)
+
+        if tile is None:
+            body_heigth = self.svg_height - meta_inforamtion_height
+            self.make_body(renderer, self.svg_width, body_heigth, layer_body)
+        else:
+            self.make_tile_body(renderer, layer_body, tile)
+
+        renderer.end_page()
+
+    def make_plan_border(self, renderer:PlanRenderer, svg_width, svg_height, margin, meta_information:dict[str, str]):
         plan_border_width = svg_width-margin*2
         plan_border_heigth = svg_height-margin*2
-    	
-        plan_border_content = ''
-        plan_border_content += f'<rect class="plan-boarder" width="{plan_border_width}" height="{plan_border_heigth}" x="{margin}" y="{margin}" />\n'
-        
-        maj, min, patch, rev = get_version()
-        version_str=version_to_str(maj, min, patch, rev)
 
-        watermark_text_1 = f'Created with CSV Floor Sketcher v{version_str}'
-        watermark_text_2 = '(https://github.com/frechdaggs/csvfloorsketcher)'
-        plan_border_content += f'<text class="watermark-text" x="{margin}" y="{margin + plan_border_heigth + 10}">{watermark_text_1}<tspan x="{margin}" dy="10">{watermark_text_2}</tspan></text>\n'
+        # The border and the watermark are the same on every page of the plan
+        renderer.symbol(f'plan-border-{self.page_size}', lambda n: self.draw_plan_border(n, plan_border_width, plan_border_heigth, margin))
 
         info_box_width = plan_border_width/3
-        info_box_height = 50
+        info_box_height = self.info_box_height
         info_box_margin = 5
         info_box_key_y_offset = 10
         info_box_text_y_offset = -5
@@ -150,54 +460,48 @@ class ConstructionPlanWriter:
             info_box_x = plan_border_width + margin - info_box_width * (counter%2 + 1)
             info_box_y = plan_border_heigth + margin - info_box_height * (int(counter/2) + 1)
 
-            plan_border_content += f'<rect class="plan-boarder" width="{info_box_width}" height="{info_box_height}" x="{info_box_x}" y="{info_box_y}" />\n'
-            plan_border_content += f'<text class="meta-information-key" x="{info_box_x+info_box_margin}" y="{info_box_y+info_box_margin+info_box_key_y_offset}">{key}</text>\n'
-            plan_border_content += f'<text class="meta-information-text" x="{info_box_x + info_box_width/2}" y="{info_box_y + info_box_height - info_box_margin + info_box_text_y_offset}">{meta_information[key]}</text>\n'
+            renderer.rect('plan-boarder', info_box_x, info_box_y, info_box_width, info_box_height)
+            renderer.text('meta-information-key', info_box_x+info_box_margin, info_box_y+info_box_margin+info_box_key_y_offset, key)
+            renderer.text('meta-information-text', info_box_x + info_box_width/2, info_box_y + info_box_height - info_box_margin + info_box_text_y_offset, meta_information[key])
             
 
-        return plan_border_content, info_box_height * (int(counter/2) + 1)
+        return self.get_meta_information_height(len(meta_information))
 
-    def make_axes(self, anchor:np.ndarray):
-        anchor1 = anchor + np.array([0, -50])
-        anchor2 = anchor
-        anchor3 = anchor + np.array([50, 0])
-        axes_content = ''
-        axes_content += f'<path class="debug-line" d="M{anchor1[0]} {anchor1[1]} L{anchor2[0]} {anchor2[1]} L{anchor3[0]} {anchor3[1]}" />\n'
-        axes_content += f'<text class="debug-text" text-anchor="end" x="{anchor3[0]}" y="{anchor3[1] - 5}">x</text>\n'
-        axes_content += f'<text class="debug-text" x="{anchor1[0] + 5}" y="{anchor1[1] + 5}">y</text>'
-
-        return axes_content
-
-    def make_compass(self, svg_width, svg_height, margin, compass_rotation):
-        
-        compass_content = ''
-        compass_content += f'<g transform="translate({margin+80} {svg_height-margin-80})">\n'
-        compass_content += f'<g transform="rotate({compass_rotation} 0 0)">\n'
-        compass_content += f'<circle r="50" stroke="black" stroke-width="2" fill="none" />\n'
-        compass_content += f'<circle r="25" stroke="black" stroke-width="2" fill="none" />\n'
-        compass_content += f'<circle r="2" stroke="black" stroke-width="2" fill="black" />\n'
-        compass_content += f'<line y1="-25" y2="25" stroke="black" stroke-width="2" />\n'
-        compass_content += f'<text x="0" y="-30" font-family="monospace" font-size="20" text-anchor="middle" fill="black">N</text>\n'
-        compass_content += f'<text x="0" y="45" font-family="monospace" font-size="20" text-anchor="middle" fill="black">S</text>\n'
-        compass_content += f'<text x="-40" y="7" font-family="monospace" font-size="20" text-anchor="middle" fill="black">W</text>\n'
-        compass_content += f'<text x="40" y="7" font-family="monospace" font-size="20" text-anchor="middle" fill="black">E</text>\n'
-        compass_content += '</g></g>\n'
-
-        return compass_content
-
-    def make_footer(self):
-        return '</svg>'
-
-    def make_style(self, class_name, *argv):
-        style_content = ''
-        style_content += f'.{class_name} {{\n'
+    def draw_plan_border(self, renderer:PlanRenderer, plan_border_width, plan_border_heigth, margin):
+        renderer.rect('plan-boarder', margin, margin, plan_border_width, plan_border_heigth)
         
-        for arg in argv:
-            style_content += f'{arg};\n'
+        maj, min, patch, rev = get_version()
+        version_str=version_to_str(maj, min, patch, rev)
+
+        watermark_text_1 = f'Created with CSV Floor Sketcher v{version_str}'
+        watermark_text_2 = '(https://github.com/frechdaggs/csvfloorsketcher)'
+        renderer.text('watermark-text', margin, margin + plan_border_heigth + 10, watermark_text_1)
+        renderer.text('watermark-text', margin, margin + plan_border_heigth + 20, watermark_text_2)
 
-        style_content += '}\n'
-        return style_content
+    def get_meta_information_height(self, count):
+        '''Height of the info boxes of count meta information (two per row).'''
+        return self.info_box_height * (int((count-1)/2) + 1)
 
+    def make_axes(self, renderer:PlanRenderer, anchor:np.ndarray):
+        anchor1 = anchor + np.array([0, -50])
+        anchor2 = anchor
+        anchor3 = anchor + np.array([50, 0])
+        renderer.path('debug-line', [anchor1, anchor2, anchor3], False)
+        renderer.text('debug-text', anchor3[0], anchor3[1] - 5, 'x', anchor='end')
+        renderer.text('debug-text', anchor1[0] + 5, anchor1[1] + 5, 'y')
+
+    def make_compass(self, renderer:PlanRenderer, svg_width, svg_height, margin, compass_rotation):
+        renderer.symbol('compass', self.draw_compass, (margin+80, svg_height-margin-80), float(compass_rotation))
+
+    def draw_compass(self, renderer:PlanRenderer):
+        renderer.circle('compass-line', (0, 0), 50)
+        renderer.circle('compass-line', (0, 0), 25)
+        renderer.circle('compass-center', (0, 0), 2)
+        renderer.line('compass-line', (0, -25), (0, 25))
+        renderer.text('compass-text', 0, -30, 'N')
+        renderer.text('compass-text', 0, 45, 'S')
+        renderer.text('compass-text', -40, 7, 'W')
+        renderer.text('compass-text', 40, 7, 'E')
 
     def get_style_class(self, dataType:DataType):
         match dataType:
@@ -221,95 +525,207 @@ class ConstructionPlanWriter:
                 raise InputError(f'No style class implemented for Part with type {dataType}')
 
 
-    def make_debug_information(self, layer:str, canvas_left_limit, canvas_right_limit):
-        part_list = self.constructionPlanSet.get_parts_in_layer(layer)
-
-        debug_content = ''
-
+    def make_debug_information(self, renderer:PlanRenderer, geometry:'LayerGeometry', canvas_left_limit, canvas_right_limit, part_indices = None):
         counter = 0
-        for part in sorted(part_list, key=lambda n: n.dataType.value):
+        for i in range(len(geometry.parts)) if part_indices is None else part_indices:
+            part = geometry.parts[i]
             match part.dataType:
                 case DataType.Outline | DataType.Room | DataType.RoomConnection | DataType.OpeningArc:
                     ref_id_text_pos = np.array([canvas_right_limit, -counter*15])
-                    shape = DebugReferenceInformationShape(self.scale_divisor, part, ref_id_text_pos)
-                    
-                    debug_content += f'{shape.get_svg_string('debug')}\n'
+                    shape = DebugReferenceInformationShape(self.scale_divisor, part, ref_id_text_pos, geometry.get_points(i))
+                    shape.render(renderer, 'debug')
 
                     counter += 1
-        
-        debug_content += f'path class\n'
-
-        return debug_content
 
-    def make_body(self, body_width, body_heigth, layer):
+    def make_layer_body(self, layer) -> 'LayerBody':
         part_list = self.constructionPlanSet.get_parts_in_layer(layer)
+        geometry = LayerGeometry(part_list, self.scale_divisor)
+        point_mask = None if self.simplifier is None else self.simplifier.point_masks.get(layer)
         
-        body_content = ''
         shapes = list()
 
-        x_min = math.inf
-        x_max = -math.inf
-        y_min = math.inf
-        y_max = -math.inf
+        for i, part in enumerate(part_list):
+            points = geometry.get_points(i)
 
-        for part in sorted(part_list, key=lambda n: n.dataType.value):
             match part.dataType:
                 case DataType.Outline | DataType.Room | DataType.Stairs | DataType.RoomConnection:
-                    shape = PathShape(self.scale_divisor, part.points, part.reference)
-
-                    x_min_shape, x_max_shape, y_min_shape, y_max_shape = shape.get_boundry()
-                    if (x_min_shape < x_min): x_min = x_min_shape
-                    if (x_max_shape > x_max): x_max = x_max_shape
-                    if (y_min_shape < y_min): y_min = y_min_shape
-                    if (y_max_shape > y_max): y_max = y_max_shape
-
-                    shapes.append(shape.get_svg_string(self.get_style_class(part.dataType)))
+                    if point_mask is not None:
+                        points = points[point_mask[geometry.offsets[i]:geometry.offsets[i+1]]]
+                    shape = PathShape(self.scale_divisor, points)
 
                 case DataType.Steps:
-                    shape = StepsShape(self.scale_divisor, part.points, part.reference)
-
-                    shapes.append(shape.get_svg_string(self.get_style_class(part.dataType)))
+                    shape = StepsShape(self.scale_divisor, points)
 
                 case DataType.OpeningArc:
-                    shape = OpeningArgShape(self.scale_divisor, part.points, part.reference)
-                    shapes.append(shape.get_svg_string(self.get_style_class(part.dataType)))
+                    shape = OpeningArgShape(self.scale_divisor, points)
                     
                 case DataType.XDim | DataType.YDim | DataType.XDimC | DataType.YDimC:
                     pt1 = part.points[0]
                     pt2 = part.points[1]
 
-                    shapes.append(DimShape(self.scale_divisor, part.dataType, pt1, pt2, part.dimOffset, part.reference).get_svg_string(self.get_style_class(part.dataType)))
+                    shape = DimShape(self.scale_divisor, part.dataType, pt1, pt2, part.dimOffset, points, geometry.anchors[i])
 
                 case DataType.Label:
                     part_label = cast(PartLabel, part)
-                    shapes.append(Label(self.scale_divisor, part_label).get_svg_string(self.get_style_class(part.dataType)))
+                    shape = Label(self.scale_divisor, part_label, geometry.anchors[i])
 
                 case _:
                     raise InputError(f'Part with type {part.dataType} not implemented in {ConstructionPlanWriter.__name__}')
 
+            shapes.append((shape, self.get_style_class(part.dataType)))
+
+        return LayerBody(geometry, shapes)
+
+    def make_body(self, renderer:PlanRenderer, body_width, body_heigth, layer_body:'LayerBody'):
+        '''Draws the whole body centered on the page.'''
+        geometry = layer_body.geometry
+        x_min, x_max, y_min, y_max = geometry.get_boundry(DataType.Outline, DataType.Room, DataType.Stairs, DataType.RoomConnection)
 
         x_offset = body_width/2 - (x_max - x_min)/2
         y_offset = body_heigth/2 - (y_max - y_min)/2 - y_min
-        body_content += f'<g transform="translate({x_offset} {y_offset})">\n'
+        renderer.begin_group((x_offset, y_offset))
 
-        for shape in shapes:
-            body_content += f'{shape}\n'
+        for shape, class_str in layer_body.shapes:
+            shape.render(renderer, class_str)
         
         if self.debug_mode:
-            body_content += self.make_debug_information(layer, -x_offset, body_width-x_offset)
+            self.make_debug_information(renderer, geometry, -x_offset, body_width-x_offset)
+
+        renderer.end_group()
+
+    def make_tile_body(self, renderer:PlanRenderer, layer_body:'LayerBody', tile:'PageTile'):
+        '''Draws the shapes intersecting the tile, clipped to the viewport of the tile.'''
+        renderer.begin_clip(tile.viewport_x, tile.viewport_y, tile.width, tile.height)
+        renderer.begin_group((tile.viewport_x - tile.x, tile.viewport_y - tile.y))
+
+        shape_indices = layer_body.index.query(tile.x, tile.x + tile.width, tile.y, tile.y + tile.height)
+        for i in shape_indices:
+            shape, class_str = layer_body.shapes[i]
+            shape.render(renderer, class_str)
+
+        if self.debug_mode:
+            self.make_debug_information(renderer, layer_body.geometry, tile.x, tile.x + tile.width, shape_indices)
+
+        renderer.end_group()
+        renderer.end_clip()
+
+class PageTile:
+    '''Area (x, y, width, height) of a layer body that is drawn into the viewport of one page.'''
+    def __init__(self, name:str, label:str, x, y, width, height, viewport_x, viewport_y):
+        self.name = name
+        self.label = label
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.viewport_x = viewport_x
+        self.viewport_y = viewport_y
+
+class LayerBody:
+    '''
+    Geometry and shapes (with their style class) of a layer, the i-th shape belongs to the i-th part.
+    For tiles, the bounding boxes of the shapes are indexed by a spatial grid.
+    '''
+    def __init__(self, geometry:'LayerGeometry', shapes:List[tuple['Shape', str]]):
+        self.geometry = geometry
+        self.shapes = shapes
+        self.boundries:np.ndarray = None
+        self.index:SpatialGrid = None
+
+    def get_boundries(self) -> np.ndarray:
+        if self.boundries is None:
+            self.boundries = np.array([shape.get_boundry() for shape, _ in self.shapes], dtype=float).reshape(-1, 4)
+        return self.boundries
+
+    def get_extent(self):
+        '''Returns x_min, x_max, y_min, y_max of all shapes.'''
+        boundries = self.get_boundries()
+        if len(boundries) == 0:
+            return 0, 0, 0, 0
+
+        return boundries[:, 0].min(), boundries[:, 1].max(), boundries[:, 2].min(), boundries[:, 3].max()
+
+    def make_index(self, cell_size):
+        self.index = SpatialGrid(self.get_boundries(), cell_size)
+
+class LayerGeometry:
+    '''
+    Points of all parts of a layer in one (N,2) buffer. Translation by the part references, mirroring of the y-axis
+    and scaling to page coordinates are done once for the whole layer. The points of the i-th part are the rows
+    offsets[i] to offsets[i+1].
+    '''
+    mirror_y = np.array([[1, 0], [0, -1]])
+
+    def __init__(self, parts:List[Part], scale_divisor):
+        self.parts = parts
+        self.scale_divisor = scale_divisor
+
+        counts = np.array([0 if part.points is None else len(part.points) for part in parts], dtype=int)
+        self.offsets = np.zeros(len(parts)+1, dtype=int)
+        np.cumsum(counts, out=self.offsets[1:])
+
+        # Points of dimensions are absolute, all other points are relative to the part reference
+        translations = np.zeros((len(parts), 2))
+        anchors = np.zeros((len(parts), 2))
+        for i, part in enumerate(parts):
+            is_dim = part.dataType in (DataType.XDim, DataType.XDimC, DataType.YDim, DataType.YDimC)
+
+            if part.reference is not None:
+                anchors[i] = part.reference
+                if not is_dim:
+                    translations[i] = part.reference
+            elif is_dim:
+                anchors[i] = part.points[0]
+
+        point_arrays = [part.points for part in parts if part.points is not None and len(part.points) > 0]
+        points = np.concatenate(point_arrays) if point_arrays else np.zeros((0, 2))
+        points = points + np.repeat(translations, counts, axis=0)
 
+        self.points = self.transform(points)
+        self.anchors = self.transform(anchors)
 
-        body_content += '</g>\n'
+        self.part_index = np.repeat(np.arange(len(parts)), counts)
 
-        return body_content
+    def transform(self, points:np.ndarray):
+        return ConstructionPlanWriter.cm_to_dots(np.matmul(points, self.mirror_y))/self.scale_divisor
+
+    def get_points(self, i) -> np.ndarray:
+        return self.points[self.offsets[i]:self.offsets[i+1]]
+
+    def get_boundry(self, *dataTypes:DataType):
+        '''Returns x_min, x_max, y_min, y_max of all points of parts with one of the given types.'''
+        part_mask = np.array([part.dataType in dataTypes for part in self.parts], dtype=bool)
+        points = self.points[part_mask[self.part_index]] if len(self.parts) > 0 else self.points
+
+        if len(points) == 0:
+            return math.inf, -math.inf, math.inf, -math.inf
+
+        x_min, y_min = points.min(axis=0)
+        x_max, y_max = points.max(axis=0)
+        return x_min, x_max, y_min, y_max
+
+# Writer of the worker processes used by ConstructionPlanWriter.make_pages
+worker_writer:ConstructionPlanWriter = None
+
+def init_worker(writer:ConstructionPlanWriter):
+    global worker_writer
+    worker_writer = writer
+    # Stages of the workers can not be reported, they are part of the "make pages" stage
+    worker_writer.profiler = Profiler()
+
+def make_page_in_worker(layer, is_savig_svg:bool):
+    return worker_writer.make_page(layer, is_savig_svg)
+
+def write_svg_files_of_layer_in_worker(layer):
+    worker_writer.write_svg_files_of_layer(layer)
 
 class Shape(ABC):
     def __init__(self, scale_divisor):
         self.scale_divisor = scale_divisor
 
     @abstractmethod
-    def get_svg_string(self, class_str):
-        raise NotImplementedException(self.get_boundry.__name__, type(self).__name__)
+    def render(self, renderer:PlanRenderer, class_str):
+        raise NotImplementedException(self.render.__name__, type(self).__name__)
 
     @abstractmethod
     def get_boundry(self):
@@ -322,19 +738,22 @@ class Shape(ABC):
         return np.matmul(point, np.array([[1, 0], [0, -1]]))
 
 class Label(Shape):
-    def __init__(self, scale_divisor, part_label:PartLabel):
+    def __init__(self, scale_divisor, part_label:PartLabel, text_anchor:np.ndarray):
         super().__init__(scale_divisor)
 
-        self.text_anchor = self.cm_to_dots(self.invert_y(part_label.reference))/self.scale_divisor
+        self.text_anchor = text_anchor
         self.text = f'{part_label.text1}'
         if part_label.text2 != '':
             self.text += f' ({part_label.text2})'
 
-    def get_svg_string(self, class_str):
-        return f'<text class="{class_str}" x="{self.text_anchor[0]}" y="{self.text_anchor[1]}">{self.text}</text>'
+    def render(self, renderer:PlanRenderer, class_str):
+        renderer.text(class_str, self.text_anchor[0], self.text_anchor[1], self.text)
 
     def get_boundry(self):
-        return super().get_boundry()
+        # Estimated for the label style (10pt monospace), characters are about 0.6 em wide
+        font_size = 13.3
+        width = len(self.text)*font_size*0.6
+        return self.text_anchor[0], self.text_anchor[0] + width, self.text_anchor[1] - font_size, self.text_anchor[1] + font_size*0.3
 
 class RectangleShape(Shape):
     def __init__(self, scale_divisor, width, height, center):
@@ -350,59 +769,44 @@ class RectangleShape(Shape):
         self.x = self.cm_to_dots(self.center[0])/self.scale_divisor - self.scaled_width/2
         self.y = self.cm_to_dots(self.center[1])/self.scale_divisor - self.scaled_height/2
     
-    def get_svg_string(self, class_str):
-        return f'<rect class="{class_str}" width="{self.scaled_width}" height="{self.scaled_height}" x="{self.x}" y="{self.y}" />'
+    def render(self, renderer:PlanRenderer, class_str):
+        renderer.rect(class_str, self.x, self.y, self.scaled_width, self.scaled_height)
 
     def get_boundry(self):
         return self.x, self.x + self.scaled_width, self.y, self.y + self.scaled_height
 
 class DebugReferenceInformationShape(Shape):
-    _svg_content = ''
-
-    def __init__(self, scale_divisor, part:Part, ref_id_text_pos:np.ndarray):
+    def __init__(self, scale_divisor, part:Part, ref_id_text_pos:np.ndarray, points_transformed:np.ndarray):
         super().__init__(scale_divisor)
         self.part = part
         self.ref_id_text_pos = ref_id_text_pos
+        self.points_transformed = points_transformed
 
-        points = part.points
-        reference = part.reference
-        
-        referenced_points = list(map(lambda n: np.add(n,reference), points))
-        mirrored_points = list(map(lambda n: self.invert_y(n), referenced_points))
-        self.points_transformed = list(map(lambda n: self.cm_to_dots(n)/self.scale_divisor, mirrored_points))
-
-    def get_svg_string(self, class_str):
+    def render(self, renderer:PlanRenderer, class_str):
         ref_id_line_pt1 = self.ref_id_text_pos + np.array([-70,-5])
         ref_id_line_pt2 = self.points_transformed[0]
-        self._svg_content += f'<line class="{class_str}-line" x1="{ref_id_line_pt1[0]}" y1="{ref_id_line_pt1[1]}" x2="{ref_id_line_pt2[0]}" y2="{ref_id_line_pt2[1]}"/>\n'
+        renderer.line(f'{class_str}-line', ref_id_line_pt1, ref_id_line_pt2)
 
         for i in range(0,len(self.points_transformed)):
             point = self.points_transformed[i]
-            self._svg_content += f'<text class="{class_str}-text" text-anchor="middle" x="{point[0]}" y="{point[1]+5}">{i+1}</text>\n'
-
-        self._svg_content += f'<text class="{class_str}-text" text-anchor="end" x="{self.ref_id_text_pos[0]}" y="{self.ref_id_text_pos[1]}">{self.part.identifier}</text>'
+            renderer.text(f'{class_str}-text', point[0], point[1]+5, i+1, anchor='middle')
 
-        return self._svg_content
+        renderer.text(f'{class_str}-text', self.ref_id_text_pos[0], self.ref_id_text_pos[1], self.part.identifier, anchor='end')
     
     def get_boundry(self):
         return super().get_boundry()
 
 
 class DimShape(Shape):
-    def __init__(self, scale_divisor, dimType:DataType, pt1, pt2, dim_offset:float, reference = None):
+    def __init__(self, scale_divisor, dimType:DataType, pt1, pt2, dim_offset:float, points_transformed:np.ndarray, reference_transformed:np.ndarray):
         super().__init__(scale_divisor)
         
         if (not (dimType == DataType.XDim or dimType == DataType.YDim or dimType == DataType.XDimC or dimType == DataType.YDimC)):
             raise Exception(f'{DimShape.__name__} cant handle {DataType.__name__} other then {DataType.XDim}, {DataType.YDim}, {DataType.XDim} or {DataType.YDim}')
 
         self.dim_offset = dim_offset
-        self.pt1_transformed = self.cm_to_dots(self.invert_y(pt1))/self.scale_divisor
-        self.pt2_transformed = self.cm_to_dots(self.invert_y(pt2))/self.scale_divisor
-
-        if reference is None:
-            reference = pt1
-        
-        reference_transformed = self.cm_to_dots(self.invert_y(reference))/self.scale_divisor
+        self.pt1_transformed = points_transformed[0]
+        self.pt2_transformed = points_transformed[1]
         
         match dimType:
             case DataType.XDim|DataType.XDimC:
@@ -450,103 +854,88 @@ class DimShape(Shape):
             case _:
                 raise Exception(f'{DimShape.__name__} cant handle {DataType.__name__} other then {DataType.XDim} oder {DataType.YDim}')
 
-    def get_svg_string(self, class_str):
+    def render(self, renderer:PlanRenderer, class_str):
         dim_line_center = (self.dim_line_anchor1 + self.dim_line_anchor2)/2
         transform_x = dim_line_center[0] + self.text_offset_x
         transform_y = dim_line_center[1] + self.text_offset_y
         transform_rot = self.text_rotation
 
-        svg_string = ''
-        svg_string += f'<text class="{class_str}-text" transform="translate({transform_x} {transform_y}) rotate({transform_rot})">{self.dimension_text}</text>'
+        renderer.text(f'{class_str}-text', transform_x, transform_y, self.dimension_text, rotation=transform_rot)
 
         if (self.dim_offset != 0):
-            line1_x1, line1_y1 = self.pt1_transformed
-            line1_x2, line1_y2 = self.dim_line_anchor1
-            line2_x1, line2_y1 = self.pt2_transformed
-            line2_x2, line2_y2 = self.dim_line_anchor2
-            line3_x1, line3_y1 = self.dim_line_anchor1
-            line3_x2, line3_y2 = self.dim_line_anchor2
+            renderer.line(f'{class_str}-line', self.pt1_transformed, self.dim_line_anchor1)
+            renderer.line(f'{class_str}-line', self.pt2_transformed, self.dim_line_anchor2)
+            renderer.line(f'{class_str}-line', self.dim_line_anchor1, self.dim_line_anchor2)
 
-            svg_string += f'\n<line class="{class_str}-line" x1="{line1_x1}" y1="{line1_y1}" x2="{line1_x2}" y2="{line1_y2}" />'
-            svg_string += f'\n<line class="{class_str}-line" x1="{line2_x1}" y1="{line2_y1}" x2="{line2_x2}" y2="{line2_y2}" />'
-            svg_string += f'\n<line class="{class_str}-line" x1="{line3_x1}" y1="{line3_y1}" x2="{line3_x2}" y2="{line3_y2}" />'
+    def get_boundry(self):
+        points = np.array([self.pt1_transformed, self.pt2_transformed, self.dim_line_anchor1, self.dim_line_anchor2])
+        x_min, y_min = points.min(axis=0)
+        x_max, y_max = points.max(axis=0)
 
-        return svg_string
+        # The text is centered at the dimension line, its size is estimated for the dim style (3mm monospace)
+        dim_line_center = (self.dim_line_anchor1 + self.dim_line_anchor2)/2
+        text_x = dim_line_center[0] + self.text_offset_x
+        text_y = dim_line_center[1] + self.text_offset_y
+        font_size = 11.3
+        text_half_width = len(str(self.dimension_text))*font_size*0.6/2
+        text_height = font_size*0.75
+        if self.text_rotation == 0:
+            text_boundry = (text_x - text_half_width, text_x + text_half_width, text_y - text_height, text_y)
+        else:
+            text_boundry = (text_x - text_height, text_x, text_y - text_half_width, text_y + text_half_width)
 
-    def get_boundry(self):
-        return super().get_boundry()
+        return min(x_min, text_boundry[0]), max(x_max, text_boundry[1]), min(y_min, text_boundry[2]), max(y_max, text_boundry[3])
 
 class PathShape(Shape):
-    def __init__(self, scale_divisor, points, reference):
+    def __init__(self, scale_divisor, scaled_points:np.ndarray):
         super().__init__(scale_divisor)
+        self.scaled_points = scaled_points
 
-        referenced_points = list(map(lambda n: np.add(n,reference), points))
-        mirrored_points = list(map(lambda n: self.invert_y(n), referenced_points))
-        self.scaled_points = list(map(lambda n: self.cm_to_dots(n)/self.scale_divisor, mirrored_points))
-
-    def get_svg_string(self, class_str):
-        svg_string = f'<path class="{class_str}" d="'
-        for i in range(0,len(self.scaled_points)):
-            if (i == 0):
-                svg_string += 'M'
-            else:
-                svg_string += 'L'
-
-            svg_string += f'{self.scaled_points[i][0]} '
-            svg_string += f'{self.scaled_points[i][1]} '
-
-        svg_string += 'Z" />'
-
-        return svg_string
+    def render(self, renderer:PlanRenderer, class_str):
+        renderer.path(class_str, self.scaled_points, True)
 
     def get_boundry(self):
-        xs = list(map(lambda n: n[0], self.scaled_points))
-        ys = list(map(lambda n: n[1], self.scaled_points))
+        if len(self.scaled_points) == 0:
+            return math.inf, -math.inf, math.inf, -math.inf
+
+        x_min, y_min = self.scaled_points.min(axis=0)
+        x_max, y_max = self.scaled_points.max(axis=0)
 
-        return min(xs), max(xs), min(ys), max(ys)
+        return x_min, x_max, y_min, y_max
     
 class StepsShape(Shape):
-    def __init__(self, scale_divisor, points, reference):
+    def __init__(self, scale_divisor, points_transformed:np.ndarray):
         super().__init__(scale_divisor)
-        self.points_transformed = list(map(lambda n: self.transform_point(n, reference, scale_divisor), points))
+        self.points_transformed = points_transformed
 
-    def transform_point(self, point:np.ndarray, reference:np.ndarray, scale_divisor):
-        point_transformed = np.add(point,reference)
-        point_transformed = self.invert_y(point_transformed)
-        point_transformed = self.cm_to_dots(point_transformed)/scale_divisor
-        return point_transformed
+    def render(self, renderer:PlanRenderer, class_str):
+        # The i-th step runs from the i-th point to the i-th point counted from the end
+        step_count = int(len(self.points_transformed)/2)
+        step_points1 = self.points_transformed[:step_count]
+        step_points2 = self.points_transformed[::-1][:step_count]
+        step_centroids = (step_points1+step_points2)/2
 
-    def get_svg_string(self, class_str):
-        step_centroids = list()
-        svg_string = ''
-        for i in range(0, int(len(self.points_transformed)/2)):
-            if i > 0:
-                svg_string += '\n'
+        for i in range(0, step_count):
+            renderer.line(class_str, step_points1[i], step_points2[i])
 
-            step_point1 = self.points_transformed[i]
-            step_point2 = self.points_transformed[len(self.points_transformed)-i-1]
+        renderer.path(class_str, step_centroids, False)
 
-            step_centroids.append((step_point1+step_point2)/2)
-
-            svg_string += SVGHelper.gen_line_string(step_point1, step_point2, class_str)
-
-        svg_string += SVGHelper.gen_path_string(step_centroids, False, class_str)
+    def get_boundry(self):
+        if len(self.points_transformed) == 0:
+            return math.inf, -math.inf, math.inf, -math.inf
 
-        return svg_string 
+        x_min, y_min = self.points_transformed.min(axis=0)
+        x_max, y_max = self.points_transformed.max(axis=0)
 
-    def get_boundry(self):
-        return super().get_boundry()
+        return x_min, x_max, y_min, y_max
 
 
 class OpeningArgShape(Shape):
-    def __init__(self, scale_divisor, points, reference):
+    def __init__(self, scale_divisor, scaled_points:np.ndarray):
         super().__init__(scale_divisor)
+        self.scaled_points = scaled_points
 
-        referenced_points = list(map(lambda n: np.add(n,reference), points))
-        mirrored_points = list(map(lambda n: self.invert_y(n), referenced_points))
-        self.scaled_points = list(map(lambda n: self.cm_to_dots(n)/self.scale_divisor, mirrored_points))
-
-    def get_svg_string(self, class_str):
+    def render(self, renderer:PlanRenderer, class_str):
         radius = np.linalg.norm(self.scaled_points[1]-self.scaled_points[0])
 
         v1 = self.scaled_points[1]-self.scaled_points[0]
@@ -558,13 +947,11 @@ class OpeningArgShape(Shape):
         else:
             arc_dir = 0
 
-        svg_string = f'<path class="{class_str}" d="'
-        svg_string += f'M{self.scaled_points[0][0]} {self.scaled_points[0][1]} '
-        svg_string += f'L{self.scaled_points[1][0]} {self.scaled_points[1][1]} '
-        svg_string += f'A{radius} {radius} 0 0 {arc_dir} {self.scaled_points[2][0]} {self.scaled_points[2][1]} '
-        svg_string += 'Z" />'
-
-        return svg_string
+        renderer.sector(class_str, self.scaled_points[0], self.scaled_points[1], self.scaled_points[2], radius, arc_dir)
 
     def get_boundry(self):
-        return super().get_boundry()    
+        # The whole circle of the sector
+        radius = np.linalg.norm(self.scaled_points[1]-self.scaled_points[0])
+        center = self.scaled_points[0]
+
+        return center[0] - radius, center[0] + radius, center[1] - radius, center[1] + radius    
@@ -0,0 +1,166 @@
+from collections import deque
+import heapq
+from typing import Dict, Iterable, List, Set, Tuple
+
+
+class DependencyGraph:
+    '''
+    Directed graph of nodes (int) and the nodes they depend on.
+    Nodes are ordered by their value wherever the dependencies leave a choice, so insertion order is kept stable.
+    '''
+
+    def __init__(self):
+        self.dependencies:Dict[int, Set[int]] = dict()
+        self.dependents:Dict[int, Set[int]] = dict()
+
+    def add_node(self, node:int):
+        self.dependencies.setdefault(node, set())
+        self.dependents.setdefault(node, set())
+
+    def set_dependencies(self, node:int, dependencies:Iterable[int]):
+        self.add_node(node)
+
+        for dependency in self.dependencies[node]:
+            self.dependents[dependency].discard(node)
+
+        self.dependencies[node] = set(dependencies)
+
+        for dependency in self.dependencies[node]:
+            self.add_node(dependency)
+            self.dependents[dependency].add(node)
+
+    def get_dependencies(self, node:int) -> Set[int]:
+        return self.dependencies[node]
+
+    def get_downstream(self, nodes:Iterable[int]) -> Set[int]:
+        '''Returns the given nodes and all nodes that depend on them directly or indirectly.'''
+        downstream = set(nodes)
+        stack = list(downstream)
+
+        while stack:
+            node = stack.pop()
+            for dependent in self.dependents[node]:
+                if dependent not in downstream:
+                    downstream.add(dependent)
+                    stack.append(dependent)
+
+        return downstream
+
+    def get_topological_order(self, nodes:Iterable[int]) -> Tuple[List[int], Set[int]]:
+        '''
+        Sorts the given nodes so that every node comes after its dependencies. Dependencies outside of the given
+        nodes are considered to be resolved already.
+        Returns the sorted nodes and the nodes which can not be sorted because they are part of or depend on a cycle.
+        '''
+        nodes = set(nodes)
+        pending_dependencies = {node: len(self.dependencies[node] & nodes) for node in nodes}
+
+        ready = [node for node, count in pending_dependencies.items() if count == 0]
+        heapq.heapify(ready)
+
+        order = list()
+        while ready:
+            node = heapq.heappop(ready)
+            order.append(node)
+
+            for dependent in self.dependents[node]:
+                if dependent in pending_dependencies:
+                    pending_dependencies[dependent] -= 1
+                    if pending_dependencies[dependent] == 0:
+                        heapq.heappush(ready, dependent)
+
+        return order, nodes.difference(order)
+
+    def find_cycles(self, nodes:Iterable[int]) -> List[List[int]]:
+        '''
+        Returns cycles within the given nodes as chains of nodes, e.g. [a, b, c, a]. Every node which is part of a
+        cycle is the first node of a returned chain or contained in one, nodes which only depend on a cycle are not.
+        '''
+        cycles = list()
+
+        for component in self.get_strongly_connected_components(nodes):
+            if len(component) == 1:
+                node = next(iter(component))
+                if node in self.dependencies[node]:
+                    cycles.append([node, node])
+                continue
+
+            uncovered = set(component)
+            for start in sorted(component):
+                if start in uncovered:
+                    cycle = self.get_shortest_cycle(start, component)
+                    uncovered.difference_update(cycle)
+                    cycles.append(cycle)
+
+        return cycles
+
+    def get_strongly_connected_components(self, nodes:Iterable[int]) -> List[Set[int]]:
+        '''Returns the strongly connected components of the given nodes (Tarjan, without recursion for long chains).'''
+        nodes = set(nodes)
+        index = dict()
+        low_link = dict()
+        stack = list()
+        on_stack = set()
+        components = list()
+
+        for root in sorted(nodes):
+            if root in index:
+                continue
+
+            index[root] = low_link[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            # Nodes being visited with the iterator of their remaining dependencies
+            work = [(root, iter(sorted(self.dependencies[root] & nodes)))]
+
+            while work:
+                node, dependencies = work[-1]
+                dependency = next(dependencies, None)
+
+                if dependency is not None:
+                    if dependency not in index:
+                        index[dependency] = low_link[dependency] = len(index)
+                        stack.append(dependency)
+                        on_stack.add(dependency)
+                        work.append((dependency, iter(sorted(self.dependencies[dependency] & nodes))))
+                    elif dependency in on_stack:
+                        low_link[node] = min(low_link[node], index[dependency])
+                    continue
+
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low_link[parent] = min(low_link[parent], low_link[node])
+
+                if low_link[node] == index[node]:
+                    component = set()
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.add(member)
+                        if member == node:
+                            break
+                    components.append(component)
+
+        return components
+
+    def get_shortest_cycle(self, start:int, component:Set[int]) -> List[int]:
+        '''Returns the shortest chain from start back to start within the strongly connected component.'''
+        predecessors = {start: None}
+        queue = deque([start])
+
+        while queue:
+            node = queue.popleft()
+            for dependency in sorted(self.dependencies[node] & component):
+                if dependency == start:
+                    # Walked back from the last node to start, the chain is closed by the dependency on start
+                    chain = [start]
+                    while node is not None:
+                        chain.append(node)
+                        node = predecessors[node]
+                    return chain[::-1]
+                if dependency not in predecessors:
+                    predecessors[dependency] = node
+                    queue.append(dependency)
+
+        raise ValueError(f'Node {start} is not part of a cycle')
@@ -0,0 +1,90 @@
+import os
+import pickle
+import sys
+from typing import Iterable
+from ConsolePrinter import print_info
+from FileHelper import open_atomic
+from PageCache import PageCache
+
+
+class DiskPageCache(PageCache):
+    '''
+    Keeps made pages as files in a cache directory, so later runs can reuse the pages of unchanged layers.
+    The file name is the page key. If the directory gets bigger than max_size (bytes), the least recently used pages
+    are removed.
+    '''
+    default_max_size = 100*1024*1024
+    file_ext = '.page'
+
+    def __init__(self, cache_dir:str = None, max_size:int = default_max_size):
+        self.cache_dir = cache_dir or DiskPageCache.get_default_cache_dir()
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get_default_cache_dir():
+        if sys.platform == 'win32':
+            base_dir = os.environ.get('LOCALAPPDATA') or os.path.expanduser('~\\AppData\\Local')
+            return os.path.join(base_dir, 'CSVFloorSketcher', 'cache')
+
+        base_dir = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+        return os.path.join(base_dir, 'csvfloorsketcher')
+
+    def get_file_path(self, key:str):
+        return os.path.join(self.cache_dir, key + DiskPageCache.file_ext)
+
+    def get(self, key:str):
+        file_path = self.get_file_path(key)
+
+        try:
+            with open(file_path, 'rb') as f:
+                svg_content, page = pickle.load(f)
+            # The modification time is used as last access time for the eviction
+            os.utime(file_path)
+        except OSError:
+            # Not cached (yet)
+            self.misses += 1
+            return None
+        except Exception:
+            # Broken files (e.g. of an interrupted run) or pages of other library versions are made again
+            self.misses += 1
+            self.remove(file_path)
+            return None
+
+        self.hits += 1
+        return svg_content, page
+
+    def put(self, key:str, svg_content:str, page):
+        # Written to a temporary file first, so other runs never read a half written page
+        with open_atomic(self.get_file_path(key)) as f:
+            pickle.dump((svg_content, page), f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def finish(self, used_keys:Iterable[str]):
+        print_info(f'Page cache: {self.hits} hit(s), {self.misses} miss(es)')
+        self.evict()
+
+    def evict(self):
+        '''Removes the least recently used pages until the cache is not bigger than max_size.'''
+        files = list()
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith(DiskPageCache.file_ext):
+                    stat = entry.stat()
+                    files.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+        size = sum(map(lambda n: n[1], files))
+        for _, file_size, file_path in sorted(files):
+            if size <= self.max_size:
+                break
+
+            self.remove(file_path)
+            size -= file_size
+
+    def remove(self, file_path:str):
+        try:
+            os.remove(file_path)
+        except OSError:
+            # Removed or opened by another run
+            pass
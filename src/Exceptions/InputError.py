@@ -1,3 +1,5 @@
 class InputError(Exception):
-    def __init__(self, msg) -> None:
-        super().__init__(msg)
\ No newline at end of file
+    def __init__(self, msg, line:int = None) -> None:
+        super().__init__(msg)
+        # Line of the csv file the error belongs to (if known)
+        self.line = line
\ No newline at end of file
@@ -0,0 +1,21 @@
+from contextlib import contextmanager
+import os
+import secrets
+
+
+@contextmanager
+def open_atomic(file_path:str, mode:str = 'wb', **kwargs):
+    '''
+    Opens a temporary file next to file_path, which replaces file_path when the block is left without an error.
+    Readers never see a half written file and a failed run keeps the previous file.
+    '''
+    # Unlike tempfile.mkstemp, open keeps the default permissions of new files
+    temp_file_path = f'{file_path}.{secrets.token_hex(4)}.tmp'
+    try:
+        with open(temp_file_path, mode.replace('w', 'x'), **kwargs) as f:
+            yield f
+        os.replace(temp_file_path, file_path)
+    except BaseException:
+        if os.path.exists(temp_file_path):
+            os.remove(temp_file_path)
+        raise
@@ -0,0 +1,110 @@
+import numpy as np
+from ConsolePrinter import print_info
+from ConstructionPlanSet import ConstructionPlanSet
+from DataType import DataType
+
+
+class GeometrySimplifier:
+    '''
+    Removes consecutive duplicate and collinear points of outlines, rooms, stairs and room connections before the
+    plan is written. A point is removed if it lies within the tolerance (cm) of the segment between its neighbours.
+    Points referenced by any entry are never removed, and every path keeps at least three points.
+
+    The parts are not changed: the result is a mask of the drawn points per layer (in the order of the points of
+    ConstructionPlanSet.get_parts_in_layer), so references and the point numbers of the debug information stay valid.
+    '''
+    simplified_types = (DataType.Outline, DataType.Room, DataType.Stairs, DataType.RoomConnection)
+
+    def __init__(self, tolerance:float):
+        self.tolerance = tolerance
+        self.point_masks:dict[str, np.ndarray] = dict()
+
+    def simplify(self, constructionPlanSet:ConstructionPlanSet) -> int:
+        '''Calculates the point masks of all layers and returns the number of removed points.'''
+        referenced_points = constructionPlanSet.get_referenced_points()
+
+        self.point_masks = dict()
+        removed_count = 0
+        point_count = 0
+        for layer in sorted(constructionPlanSet.get_layers()):
+            point_mask = self.get_point_mask(constructionPlanSet, layer, referenced_points)
+            self.point_masks[layer] = point_mask
+            removed_count += len(point_mask) - np.count_nonzero(point_mask)
+            point_count += len(point_mask)
+
+        print_info(f'Simplification removed {removed_count} of {point_count} point(s)')
+        return removed_count
+
+    def get_point_mask(self, constructionPlanSet:ConstructionPlanSet, layer, referenced_points:dict[str, set[tuple[str, int]]]) -> np.ndarray:
+        parts = constructionPlanSet.get_parts_in_layer(layer)
+
+        counts = np.array([0 if part.points is None else len(part.points) for part in parts], dtype=int)
+        offsets = np.zeros(len(parts)+1, dtype=int)
+        np.cumsum(counts, out=offsets[1:])
+
+        point_arrays = [part.points for part in parts if part.points is not None and len(part.points) > 0]
+        if not point_arrays:
+            return np.ones(0, dtype=bool)
+
+        # The reference of a part moves all of its points alike, so the relative points are sufficient
+        points = np.concatenate(point_arrays).astype(float)
+        part_index = np.repeat(np.arange(len(parts)), counts)
+
+        is_removable = np.array([part.dataType in self.simplified_types for part in parts], dtype=bool)[part_index]
+        # Shared parts of several layers are referenced by their own layer key
+        part_indices_by_key:dict[tuple[str, str], list[int]] = dict()
+        for i, part in enumerate(parts):
+            part_indices_by_key.setdefault((part.layer, part.identifier), list()).append(i)
+        for layer_key in set(map(lambda n: n[0], part_indices_by_key.keys())):
+            for identifier, idx in referenced_points.get(layer_key, ()):
+                for i in part_indices_by_key.get((layer_key, identifier), ()):
+                    if idx < counts[i]:
+                        is_removable[offsets[i] + idx] = False
+
+        point_mask = np.ones(len(points), dtype=bool)
+        while True:
+            removed = self.get_removed_points(points[point_mask], part_index[point_mask], is_removable[point_mask])
+            if not removed.any():
+                return point_mask
+
+            point_mask[np.flatnonzero(point_mask)[removed]] = False
+
+    def get_removed_points(self, points:np.ndarray, part_index:np.ndarray, is_removable:np.ndarray) -> np.ndarray:
+        '''
+        One pass over the points of all parts (grouped by part_index, each part is a closed path). Returns the mask of
+        points to remove. Neighbouring points are never removed in the same pass, as each point is only checked
+        against its current neighbours.
+        '''
+        n = len(points)
+        positions = np.arange(n)
+        is_first = np.r_[True, part_index[1:] != part_index[:-1]]
+        is_last = np.r_[part_index[1:] != part_index[:-1], True]
+        first_positions = np.maximum.accumulate(np.where(is_first, positions, 0))
+        last_positions = np.minimum.accumulate(np.where(is_last, positions, n)[::-1])[::-1]
+
+        previous_positions = np.where(is_first, last_positions, positions-1)
+        next_positions = np.where(is_last, first_positions, positions+1)
+
+        # Distance of every point to the segment between its neighbours
+        previous_points = points[previous_positions]
+        segments = points[next_positions] - previous_points
+        offsets = points - previous_points
+        segment_lengths = np.einsum('ij,ij->i', segments, segments)
+        t = np.divide(np.einsum('ij,ij->i', offsets, segments), segment_lengths, out=np.zeros(n), where=segment_lengths > 0)
+        distances = np.linalg.norm(offsets - np.clip(t, 0, 1)[:, np.newaxis]*segments, axis=1)
+
+        is_candidate = is_removable & (distances <= self.tolerance)
+
+        # Every second point of a run of candidates is removed, starting with the first one
+        is_run_start = is_candidate & (is_first | ~is_candidate[previous_positions])
+        run_start_positions = np.maximum.accumulate(np.where(is_run_start, positions, 0))
+        removed = is_candidate & ((positions - run_start_positions) % 2 == 0)
+        # The last and the first point of a path are neighbours as well
+        removed &= ~(is_last & removed[next_positions] & (next_positions != positions))
+
+        # Paths keep at least three points
+        part_counts = last_positions - first_positions + 1
+        removed_counts = np.bincount(part_index, weights=removed, minlength=part_index.max()+1 if n > 0 else 0)
+        removed &= (part_counts - removed_counts[part_index]) >= 3
+
+        return removed
@@ -0,0 +1,162 @@
+import math
+from typing import Callable, List
+import numpy as np
+from reportlab.lib import colors
+from reportlab.lib.units import toLength
+from reportlab.pdfgen.canvas import Canvas, FILL_NON_ZERO
+from PlanRenderer import PlanRenderer
+import PlanStyle
+
+
+class PDFStyle:
+    '''Style class of PlanStyle.styles converted to reportlab values. Lengths are interpreted like svglib does.'''
+
+    def __init__(self, properties:dict[str, str]):
+        self.fill_color = PDFStyle.convert_color(properties.get('fill', 'black'))
+        self.stroke_color = PDFStyle.convert_color(properties.get('stroke', 'none'))
+        self.stroke_width = PDFStyle.convert_length(properties.get('stroke-width', '1'))
+        self.font_size = PDFStyle.convert_length(properties.get('font-size', '12'))
+        self.font_name = 'Courier-Bold' if properties.get('font-weight') == 'bold' else 'Courier'
+        self.text_anchor = properties.get('text-anchor', 'start')
+
+    def convert_color(value:str):
+        return None if value == 'none' else colors.toColor(value)
+
+    def convert_length(value:str):
+        if value.endswith('px'):
+            return float(value[:-2])
+        elif value.endswith('pt'):
+            return float(value[:-2])*1.25
+        else:
+            return toLength(value)
+
+
+class PDFRenderer(PlanRenderer):
+    '''
+    Draws a page directly on a reportlab canvas. Paths are filled with the nonzero rule like in svg (reportlab uses
+    even-odd unless svglib is imported, which patches the canvas).
+    Symbols are drawn once as form XObject, every further use only references it.
+    '''
+
+    def __init__(self, canvas:Canvas):
+        self.canvas = canvas
+        self.styles = dict(map(lambda n: (n[0], PDFStyle(n[1])), PlanStyle.styles.items()))
+        self.page_size = (0, 0)
+        self.symbol_names:set[str] = set()
+
+    def begin_page(self, width, height):
+        self.page_size = (width, height)
+        # Switch to svg user space with the y-axis pointing down
+        self.canvas.saveState()
+        self.canvas.translate(0, height)
+        self.canvas.scale(1, -1)
+
+    def end_page(self):
+        self.canvas.restoreState()
+        self.canvas.showPage()
+
+    def begin_group(self, translation = (0, 0), rotation = 0):
+        self.canvas.saveState()
+        self.canvas.translate(translation[0], translation[1])
+        if rotation != 0:
+            self.canvas.rotate(rotation)
+
+    def end_group(self):
+        self.canvas.restoreState()
+
+    def begin_clip(self, x, y, width, height):
+        self.canvas.saveState()
+        clip_path = self.canvas.beginPath()
+        clip_path.rect(x, y, width, height)
+        self.canvas.clipPath(clip_path, stroke=0, fill=0)
+
+    def end_clip(self):
+        self.canvas.restoreState()
+
+    def symbol(self, name:str, draw:Callable[[PlanRenderer], None], translation = (0, 0), rotation = 0):
+        if name not in self.symbol_names:
+            # The bounding box of the form has to contain the whole symbol, which is drawn around its origin
+            width, height = self.page_size
+            self.canvas.beginForm(name, -width, -height, 2*width, 2*height)
+            draw(self)
+            self.canvas.endForm()
+            self.symbol_names.add(name)
+
+        self.begin_group(translation, rotation)
+        self.canvas.doForm(name)
+        self.end_group()
+
+    def apply_style(self, style:PDFStyle):
+        if style.fill_color is not None:
+            self.canvas.setFillColor(style.fill_color)
+        if style.stroke_color is not None:
+            self.canvas.setStrokeColor(style.stroke_color)
+            self.canvas.setLineWidth(style.stroke_width)
+
+        return int(style.stroke_color is not None), int(style.fill_color is not None)
+
+    def rect(self, class_name:str, x, y, width, height):
+        stroke, fill = self.apply_style(self.styles[class_name])
+        self.canvas.rect(x, y, width, height, stroke=stroke, fill=fill)
+
+    def path(self, class_name:str, points:List[np.ndarray], is_closed_path:bool):
+        if len(points) == 0:
+            return
+
+        pdf_path = self.canvas.beginPath()
+        pdf_path.moveTo(points[0][0], points[0][1])
+        for point in points[1:]:
+            pdf_path.lineTo(point[0], point[1])
+        if is_closed_path:
+            pdf_path.close()
+
+        stroke, fill = self.apply_style(self.styles[class_name])
+        self.canvas.drawPath(pdf_path, stroke=stroke, fill=fill, fillMode=FILL_NON_ZERO)
+
+    def sector(self, class_name:str, center:np.ndarray, start:np.ndarray, end:np.ndarray, radius, sweep:int):
+        start_angle = math.degrees(math.atan2(start[1]-center[1], start[0]-center[0]))
+        end_angle = math.degrees(math.atan2(end[1]-center[1], end[0]-center[0]))
+
+        # Sweep 1 runs in direction of increasing angles, the arc is always the short one
+        extent = (end_angle - start_angle) % 360
+        if sweep == 0:
+            extent -= 360
+
+        pdf_path = self.canvas.beginPath()
+        pdf_path.moveTo(center[0], center[1])
+        pdf_path.arcTo(center[0]-radius, center[1]-radius, center[0]+radius, center[1]+radius, start_angle, extent)
+        pdf_path.close()
+
+        stroke, fill = self.apply_style(self.styles[class_name])
+        self.canvas.drawPath(pdf_path, stroke=stroke, fill=fill, fillMode=FILL_NON_ZERO)
+
+    def line(self, class_name:str, pt1:np.ndarray, pt2:np.ndarray):
+        stroke, _ = self.apply_style(self.styles[class_name])
+        if stroke:
+            self.canvas.line(pt1[0], pt1[1], pt2[0], pt2[1])
+
+    def circle(self, class_name:str, center, radius):
+        stroke, fill = self.apply_style(self.styles[class_name])
+        self.canvas.circle(center[0], center[1], radius, stroke=stroke, fill=fill)
+
+    def text(self, class_name:str, x, y, text:str, anchor:str = None, rotation = 0):
+        style = self.styles[class_name]
+        self.apply_style(style)
+
+        self.canvas.saveState()
+        self.canvas.translate(x, y)
+        if rotation != 0:
+            self.canvas.rotate(rotation)
+        # Text has to be mirrored back, otherwise it would be upside down in svg user space
+        self.canvas.scale(1, -1)
+        self.canvas.setFont(style.font_name, style.font_size)
+
+        match anchor or style.text_anchor:
+            case 'middle':
+                self.canvas.drawCentredString(0, 0, str(text))
+            case 'end':
+                self.canvas.drawRightString(0, 0, str(text))
+            case _:
+                self.canvas.drawString(0, 0, str(text))
+
+        self.canvas.restoreState()
@@ -0,0 +1,24 @@
+from typing import Iterable
+
+
+class PageCache:
+    '''
+    Keeps made pages (svg content and page) in memory, keyed by the page key of ConstructionPlanWriter.
+    After a plan was written only the pages of this plan are kept.
+    '''
+
+    def __init__(self):
+        self.pages = dict()
+
+    def get(self, key:str):
+        '''Returns the svg content and page of the key or None.'''
+        return self.pages.get(key)
+
+    def put(self, key:str, svg_content:str, page):
+        self.pages[key] = (svg_content, page)
+
+    def finish(self, used_keys:Iterable[str]):
+        '''Called after the plan was written with the keys of all of its pages.'''
+        used_keys = set(used_keys)
+        for key in set(self.pages.keys()).difference(used_keys):
+            del self.pages[key]
@@ -0,0 +1,90 @@
+import queue
+import threading
+from typing import Callable, List
+
+
+class PagePipeline:
+    '''
+    Makes pages in a background thread while the caller draws the previous page, and saves the svg files in another
+    background thread. This needs no process pool (e.g. in the frozen executable).
+
+    make_page is called with the layer and a function to save an svg file (page name, content), the function only
+    queues the file. The queues are bounded, so at most `depth` made pages and `depth` svg files wait at any time.
+    The pages are yielded in the order of the layers.
+    '''
+    # Seconds a full queue is waited for before checking whether the pipeline was stopped
+    poll_interval = 0.1
+
+    def __init__(self, make_page:Callable[[str, Callable[[str, str], None]], object], save_svg:Callable[[str, str], None], depth:int = 1):
+        self.make_page = make_page
+        self.save_svg = save_svg
+        self.depth = depth
+
+        self.pages = queue.Queue(maxsize=depth)
+        self.svg_files = queue.Queue(maxsize=depth)
+        self.stopped = threading.Event()
+        self.save_error:BaseException = None
+
+    def run(self, layers:List[str]):
+        producer = threading.Thread(target=self.produce, args=(layers,), name='page producer', daemon=True)
+        svg_saver = threading.Thread(target=self.save_svg_files, name='svg saver', daemon=True)
+        producer.start()
+        svg_saver.start()
+
+        is_complete = False
+        try:
+            for _ in layers:
+                page = self.pages.get()
+                if isinstance(page, BaseException):
+                    raise page
+                self.check_save_error()
+                yield page
+            is_complete = True
+        finally:
+            # A failed or closed consumer stops the producer, which might wait for space in a queue
+            self.stopped.set()
+            producer.join()
+            self.svg_files.put(None)
+            svg_saver.join()
+
+        if is_complete:
+            self.check_save_error()
+
+    def produce(self, layers:List[str]):
+        try:
+            for layer in layers:
+                page = self.make_page(layer, self.queue_svg_file)
+                if not self.put(self.pages, page):
+                    return
+        except BaseException as e:
+            self.put(self.pages, e)
+
+    def queue_svg_file(self, page_name:str, svg_content:str):
+        self.put(self.svg_files, (page_name, svg_content))
+
+    def save_svg_files(self):
+        while True:
+            svg_file = self.svg_files.get()
+            if svg_file is None:
+                return
+
+            # After an error the queue is still emptied, so the producer is not blocked
+            if self.save_error is None:
+                try:
+                    self.save_svg(*svg_file)
+                except BaseException as e:
+                    self.save_error = e
+
+    def check_save_error(self):
+        if self.save_error is not None:
+            raise self.save_error
+
+    def put(self, items:queue.Queue, item) -> bool:
+        '''Waits for space in the queue. Returns False if the pipeline was stopped before.'''
+        while not self.stopped.is_set():
+            try:
+                items.put(item, timeout=PagePipeline.poll_interval)
+                return True
+            except queue.Full:
+                pass
+        return False
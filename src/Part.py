@@ -1,9 +1,16 @@
+import numpy as np
 from numpy import ndarray
 from DataType import DataType
 from Exceptions.InputError import InputError
 
 
 class Part:
+    '''
+    Resolved part of the plan. The points are stored as one (N,2) array, parts have slots instead of an attribute
+    dictionary, so big plans need little memory per part.
+    '''
+    __slots__ = ('identifier', 'dataType', 'layer', 'dimOffset', 'reference', 'points')
+
     def __init__(self, identifier:str, dataType:DataType, layer:str, dimOffset:str, reference:ndarray, points):
         self.identifier = identifier
         self.dataType = dataType
@@ -15,4 +22,21 @@ class Part:
             raise InputError(f'Value with key "Dim-Offset" must be a floating number.')
         
         self.reference = reference
-        self.points = points
\ No newline at end of file
+
+        if points is not None:
+            points = np.asarray(points)
+            # Reshaping creates a view (another array object), so only if needed (e.g. for empty payloads)
+            if points.ndim != 2:
+                points = points.reshape(-1, 2)
+        self.points:ndarray = points
+
+    def hash_content(self, hash_object):
+        '''Adds everything that is drawn of the part to the given hashlib object.'''
+        hash_object.update(f'{self.identifier}\0{self.dataType.name}\0{self.dimOffset}\0'.encode('utf-8'))
+
+        for values in (self.reference, self.points):
+            if values is not None:
+                array = np.ascontiguousarray(values)
+                hash_object.update(f'{array.dtype.str}{array.shape}'.encode('utf-8'))
+                hash_object.update(array.tobytes())
+            hash_object.update(b'\0')
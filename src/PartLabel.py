@@ -4,10 +4,14 @@ from Part import Part
 
 
 class PartLabel(Part):
+    __slots__ = ('text1', 'text2')
+
     def __init__(self, identifier: str, dataType: DataType, layer: str, reference: ndarray, text1, text2):
         super().__init__(identifier, dataType, layer, None, reference, None)
         
         self.text1 = text1
         self.text2 = text2
 
-    
\ No newline at end of file
+    def hash_content(self, hash_object):
+        super().hash_content(hash_object)
+        hash_object.update(f'{self.text1}\0{self.text2}\0'.encode('utf-8'))
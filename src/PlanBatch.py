@@ -0,0 +1,69 @@
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import time
+from typing import Callable, List
+import ConsolePrinter
+from ConsolePrinter import print_error, print_info
+from Exceptions.InputError import InputError
+
+
+class PlanBatch:
+    '''
+    Makes the plans of several csv files in one process (or a pool of processes if jobs > 1), so the imports are paid
+    only once. A file with errors does not stop the batch, all errors are listed in the summary.
+    '''
+
+    def __init__(self, csv_files:List[str], make_plan:Callable[[str], None], jobs:int):
+        self.csv_files = csv_files
+        self.make_plan = make_plan
+        self.jobs = jobs
+
+    def run(self):
+        '''Makes all plans and returns the number of failed plans.'''
+        start = time.perf_counter()
+        results = list()
+
+        for csv_file, error, duration in self.make_plans():
+            if error is None:
+                print_info(f'{csv_file}: plan written in {duration:.2f}s')
+            else:
+                print_error(f'{csv_file}: {error}')
+            results.append((csv_file, error, duration))
+
+        failed_results = list(filter(lambda n: n[1] is not None, results))
+
+        print_info(f'{len(results)-len(failed_results)} plan(s) written, {len(failed_results)} failed in {time.perf_counter()-start:.2f}s')
+        if results:
+            slowest_file, _, slowest_duration = max(results, key=lambda n: n[2])
+            print_info(f'Average {sum(map(lambda n: n[2], results))/len(results):.2f}s per plan, slowest {slowest_file} ({slowest_duration:.2f}s)')
+        for csv_file, error, _ in failed_results:
+            print_error(f'Failed: {csv_file}: {error}')
+
+        return len(failed_results)
+
+    def make_plans(self):
+        if self.jobs <= 1 or len(self.csv_files) <= 1:
+            for csv_file in self.csv_files:
+                yield make_plan_in_batch(self.make_plan, csv_file)
+            return
+
+        with ProcessPoolExecutor(max_workers=min(self.jobs, len(self.csv_files)), initializer=init_batch_worker, initargs=(ConsolePrinter.log_level,)) as executor:
+            yield from executor.map(make_plan_in_batch, repeat(self.make_plan), self.csv_files)
+
+
+def init_batch_worker(log_level:int):
+    ConsolePrinter.set_log_level(log_level)
+
+def make_plan_in_batch(make_plan:Callable[[str], None], csv_file:str):
+    '''Returns the csv file, the error message (None on success) and the duration.'''
+    start = time.perf_counter()
+    try:
+        make_plan(csv_file)
+        error = None
+    except InputError as e:
+        error = str(e)
+    except Exception as e:
+        # Unexpected errors of one file must not stop the batch either
+        error = f'{type(e).__name__}: {e}'
+
+    return csv_file, error, time.perf_counter() - start
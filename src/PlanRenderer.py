@@ -0,0 +1,70 @@
+from abc import ABC, abstractmethod
+from typing import Callable, List
+import numpy as np
+from Exceptions.NotImplementedException import NotImplementedException
+
+
+class PlanRenderer(ABC):
+    '''
+    Drawing primitives used by the ConstructionPlanWriter and its shapes.
+    Coordinates are given in svg user space (dots, y-axis pointing down), styles as class names of PlanStyle.styles.
+    '''
+
+    @abstractmethod
+    def begin_page(self, width, height):
+        raise NotImplementedException(self.begin_page.__name__, type(self).__name__)
+
+    @abstractmethod
+    def end_page(self):
+        raise NotImplementedException(self.end_page.__name__, type(self).__name__)
+
+    @abstractmethod
+    def begin_group(self, translation = (0, 0), rotation = 0):
+        raise NotImplementedException(self.begin_group.__name__, type(self).__name__)
+
+    @abstractmethod
+    def end_group(self):
+        raise NotImplementedException(self.end_group.__name__, type(self).__name__)
+
+    @abstractmethod
+    def begin_clip(self, x, y, width, height):
+        '''Everything drawn until end_clip is clipped to the rectangle.'''
+        raise NotImplementedException(self.begin_clip.__name__, type(self).__name__)
+
+    @abstractmethod
+    def end_clip(self):
+        raise NotImplementedException(self.end_clip.__name__, type(self).__name__)
+
+    def symbol(self, name:str, draw:Callable[['PlanRenderer'], None], translation = (0, 0), rotation = 0):
+        '''
+        Draws a symbol like begin_group, draw(self) and end_group would. The name identifies what draw draws, so
+        renderers can draw a symbol once and reuse it wherever it is used again.
+        '''
+        self.begin_group(translation, rotation)
+        draw(self)
+        self.end_group()
+
+    @abstractmethod
+    def rect(self, class_name:str, x, y, width, height):
+        raise NotImplementedException(self.rect.__name__, type(self).__name__)
+
+    @abstractmethod
+    def path(self, class_name:str, points:List[np.ndarray], is_closed_path:bool):
+        raise NotImplementedException(self.path.__name__, type(self).__name__)
+
+    @abstractmethod
+    def sector(self, class_name:str, center:np.ndarray, start:np.ndarray, end:np.ndarray, radius, sweep:int):
+        '''Closed path from center to start, along the arc to end and back to center. Sweep as the svg sweep-flag.'''
+        raise NotImplementedException(self.sector.__name__, type(self).__name__)
+
+    @abstractmethod
+    def line(self, class_name:str, pt1:np.ndarray, pt2:np.ndarray):
+        raise NotImplementedException(self.line.__name__, type(self).__name__)
+
+    @abstractmethod
+    def circle(self, class_name:str, center, radius):
+        raise NotImplementedException(self.circle.__name__, type(self).__name__)
+
+    @abstractmethod
+    def text(self, class_name:str, x, y, text:str, anchor:str = None, rotation = 0):
+        raise NotImplementedException(self.text.__name__, type(self).__name__)
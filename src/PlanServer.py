@@ -0,0 +1,188 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import io
+import threading
+from typing import Callable
+from urllib.parse import parse_qs, urlsplit
+from ConsolePrinter import print_debug, print_error, print_info
+from ConstructionPlanSet import ConstructionPlanSet
+from ConstructionPlanWriter import ConstructionPlanWriter
+from Exceptions.InputError import InputError
+
+
+class PlanServer:
+    '''
+    Local http server that makes plans of csv contents sent to it. The process stays running, so the imports of
+    reportlab and the cached styles and symbols are reused by all requests.
+
+    POST /pdf          csv content in the body, returns the pdf
+    POST /svg?layer=X  csv content in the body, returns the svg of layer X (optional if the plan has one layer)
+    GET  /health       returns "ok"
+
+    "debug=1" adds the debug information. Errors in the csv content are answered with 422 and the error message.
+    At most `jobs` plans are made at the same time and at most `queue_size` requests wait for that, further requests
+    are answered with 503. The results of the last `cache_entries` requests are kept in memory.
+    '''
+    max_content_length = 64*1024*1024
+
+    def __init__(self, host:str, port:int, make_plan_set:Callable[[str], ConstructionPlanSet], jobs:int = 1, queue_size:int = 8, cache_entries:int = 32):
+        self.host = host
+        self.port = port
+        self.make_plan_set = make_plan_set
+        self.jobs = jobs
+        self.cache_entries = cache_entries
+
+        self.executor = ThreadPoolExecutor(max_workers=jobs)
+        # Running and waiting requests share the slots, requests without a slot are rejected
+        self.slots = threading.BoundedSemaphore(jobs + queue_size)
+
+        self.results:OrderedDict[str, tuple[str, bytes]] = OrderedDict()
+        self.results_lock = threading.Lock()
+
+    def run(self):
+        self.warm_up()
+
+        http_server = ThreadingHTTPServer((self.host, self.port), PlanRequestHandler)
+        http_server.plan_server = self
+        print_info(f'Serving plans on http://{self.host}:{http_server.server_port} (stop with Ctrl+C)')
+        try:
+            http_server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            http_server.server_close()
+            self.executor.shutdown()
+
+    def warm_up(self):
+        '''Imports the pdf backend before the first request, so the first request is as fast as the following ones.'''
+        from reportlab.pdfgen import canvas
+        from PDFRenderer import PDFRenderer
+
+    def render(self, kind:str, csv_content:bytes, layer:str = None, debug_mode:bool = False) -> tuple[str, bytes]:
+        '''
+        Returns the content type and the content of the pdf (kind "pdf") or the svg of the layer (kind "svg").
+        Returns None if all slots are taken.
+        '''
+        key = self.get_result_key(kind, csv_content, layer, debug_mode)
+        result = self.get_result(key)
+        if result is not None:
+            print_debug(f'Reusing result {key[:12]}')
+            return result
+
+        if not self.slots.acquire(blocking=False):
+            return None
+        try:
+            result = self.executor.submit(self.make_result, kind, csv_content, layer, debug_mode).result()
+        finally:
+            self.slots.release()
+
+        self.put_result(key, result)
+        return result
+
+    def make_result(self, kind:str, csv_content:bytes, layer:str, debug_mode:bool) -> tuple[str, bytes]:
+        try:
+            csv_text = csv_content.decode('utf-8-sig')
+        except UnicodeDecodeError:
+            raise InputError('The csv content is not utf-8 encoded')
+
+        constructionPlanSet = self.make_plan_set(csv_text)
+        writer = ConstructionPlanWriter(None, constructionPlanSet, debug_mode)
+
+        if kind == 'pdf':
+            pdf_stream = io.BytesIO()
+            writer.write(False, pdf_stream=pdf_stream)
+            return 'application/pdf', pdf_stream.getvalue()
+
+        layers = sorted(constructionPlanSet.get_layers())
+        if layer is None and len(layers) == 1:
+            layer = layers[0]
+        if layer not in layers:
+            raise InputError(f'Layer {layer} does not exist, the plan has the layers {', '.join(layers)}')
+
+        layer_body, pages = writer.get_layer_pages(layer)
+        page_name, tile = pages[0]
+        svg_stream = io.StringIO(newline='')
+        writer.write_svg(svg_stream, layer, layer_body, tile)
+        return 'image/svg+xml', svg_stream.getvalue().encode('utf-8')
+
+    def get_result_key(self, kind:str, csv_content:bytes, layer:str, debug_mode:bool):
+        result_hash = hashlib.sha256(csv_content)
+        result_hash.update(repr((kind, layer, debug_mode)).encode('utf-8'))
+        return result_hash.hexdigest()
+
+    def get_result(self, key:str):
+        with self.results_lock:
+            result = self.results.get(key)
+            if result is not None:
+                self.results.move_to_end(key)
+            return result
+
+    def put_result(self, key:str, result:tuple[str, bytes]):
+        with self.results_lock:
+            self.results[key] = result
+            self.results.move_to_end(key)
+            while len(self.results) > self.cache_entries:
+                self.results.popitem(last=False)
+
+
+class PlanRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if urlsplit(self.path).path == '/health':
+            self.send_content(HTTPStatus.OK, 'text/plain', b'ok')
+            return
+
+        self.send_message(HTTPStatus.NOT_FOUND, 'Unknown path')
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        kind = url.path.strip('/')
+        if kind not in ('pdf', 'svg'):
+            self.send_message(HTTPStatus.NOT_FOUND, 'Unknown path, use /pdf or /svg')
+            return
+
+        query = parse_qs(url.query)
+        layer = query.get('layer', [None])[0]
+        debug_mode = query.get('debug', ['0'])[0] in ('1', 'true')
+
+        try:
+            content_length = int(self.headers.get('Content-Length', ''))
+        except ValueError:
+            self.send_message(HTTPStatus.LENGTH_REQUIRED, 'The content length is required')
+            return
+        if content_length > PlanServer.max_content_length:
+            self.send_message(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, 'The csv content is too large')
+            return
+        csv_content = self.rfile.read(content_length)
+
+        try:
+            result = self.server.plan_server.render(kind, csv_content, layer, debug_mode)
+        except (InputError, ValueError) as e:
+            self.send_message(HTTPStatus.UNPROCESSABLE_ENTITY, str(e))
+            return
+        except Exception as e:
+            print_error(f'Making the plan failed: {e!r}')
+            self.send_message(HTTPStatus.INTERNAL_SERVER_ERROR, 'Making the plan failed')
+            return
+
+        if result is None:
+            self.send_message(HTTPStatus.SERVICE_UNAVAILABLE, 'Too many requests, try again later')
+            return
+
+        content_type, content = result
+        self.send_content(HTTPStatus.OK, content_type, content)
+
+    def send_message(self, status:HTTPStatus, message:str):
+        self.send_content(status, 'text/plain; charset=utf-8', f'{message}\n'.encode('utf-8'))
+
+    def send_content(self, status:HTTPStatus, content_type:str, content:bytes):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        print_debug(f'{self.address_string()} - {format % args}')
@@ -0,0 +1,21 @@
+# Style classes of the plan as CSS properties. They are used as <style>-block in the svg and by the direct pdf renderer.
+styles:dict[str, dict[str, str]] = {
+    'plan-boarder': {'fill': 'none', 'stroke': 'black', 'stroke-width': '2px'},
+    'watermark-text': {'font-size': '8pt', 'font-family': 'monospace'},
+    'meta-information-key': {'font-size': '10pt', 'font-family': 'monospace', 'text-anchor': 'start'},
+    'meta-information-text': {'font-size': '10pt', 'font-family': 'monospace', 'font-weight': 'bold', 'text-anchor': 'middle'},
+    'label-text': {'fill': 'black', 'font-size': '10pt', 'font-family': 'monospace', 'font-weight': 'bold'},
+    'debug-text': {'fill': '#ac9d00', 'font-size': '10pt', 'font-family': 'monospace', 'font-weight': 'bold'},
+    'debug-line': {'fill': 'none', 'stroke': '#ac9d00', 'stroke-width': '0.5px'},
+    'dim-text': {'fill': '#a10000', 'font-size': '3mm', 'font-family': 'monospace', 'font-weight': 'bold', 'text-anchor': 'middle'},
+    'dim-line': {'fill': 'none', 'stroke': 'black', 'stroke-width': '0.5px'},
+    'outline': {'fill': '#2b2b2b', 'stroke': 'black', 'stroke-width': '1px'},
+    'room': {'fill': '#d9d9d9', 'stroke': 'black', 'stroke-width': '1px'},
+    'stairs': {'fill': '#b3b3b3', 'stroke': 'black', 'stroke-width': '1px'},
+    'steps': {'fill': 'none', 'stroke': 'black', 'stroke-width': '1px'},
+    'room-connection': {'fill': '#797979', 'stroke': 'black', 'stroke-width': '1px'},
+    'opening-arc': {'fill': '#b3b3b3', 'stroke': 'black', 'stroke-width': '0.5px'},
+    'compass-line': {'fill': 'none', 'stroke': 'black', 'stroke-width': '2px'},
+    'compass-center': {'fill': 'black', 'stroke': 'black', 'stroke-width': '2px'},
+    'compass-text': {'fill': 'black', 'font-size': '20px', 'font-family': 'monospace', 'text-anchor': 'middle'},
+}
@@ -0,0 +1,119 @@
+import os
+import time
+from typing import Callable, Iterable, List
+from ConsolePrinter import print_error, print_info
+from ConstructionPlanSet import ConstructionPlanSet
+from ConstructionPlanWriter import ConstructionPlanWriter
+from Exceptions.InputError import InputError
+from GeometrySimplifier import GeometrySimplifier
+from PageCache import PageCache
+
+
+class PlanWatcher:
+    '''
+    Watches the csv file and writes the plan again whenever the file changes.
+    Changed rows are recalculated with ConstructionPlanSet.update_data if the structure of the file stays the same,
+    and only pages of layers whose content changed are made again.
+    '''
+    poll_interval = 0.5
+
+    def __init__(self, csv_file, load_entries:Callable[[str], Iterable[dict]], file_path_base, debug_mode, backend, is_savig_svg, jobs, tile_overlap:float = None, simplify_tolerance:float = None):
+        self.csv_file = csv_file
+        self.load_entries = load_entries
+        self.file_path_base = file_path_base
+        self.debug_mode = debug_mode
+        self.backend = backend
+        self.is_savig_svg = is_savig_svg
+        self.jobs = jobs
+        self.tile_overlap = tile_overlap
+        self.simplify_tolerance = simplify_tolerance
+
+        self.entries:List[dict] = None
+        self.constructionPlanSet:ConstructionPlanSet = None
+        self.page_cache = PageCache()
+
+    def run(self):
+        print_info(f'Watching {self.csv_file} (stop with Ctrl+C)')
+
+        last_modification = None
+        try:
+            while True:
+                try:
+                    modification = os.stat(self.csv_file).st_mtime_ns
+                except FileNotFoundError:
+                    # Some editors replace the file when saving
+                    modification = last_modification
+
+                if modification != last_modification:
+                    last_modification = modification
+                    self.update()
+
+                time.sleep(self.poll_interval)
+        except KeyboardInterrupt:
+            pass
+
+    def update(self):
+        start = time.perf_counter()
+
+        try:
+            entries = list(self.load_entries(self.csv_file))
+            self.update_plan_set(entries)
+
+            simplifier = None
+            if self.simplify_tolerance is not None:
+                simplifier = GeometrySimplifier(self.simplify_tolerance)
+                simplifier.simplify(self.constructionPlanSet)
+
+            writer = ConstructionPlanWriter(self.file_path_base, self.constructionPlanSet, self.debug_mode, self.backend, tile_overlap=self.tile_overlap, simplifier=simplifier)
+            made_layers = writer.write(self.is_savig_svg, self.jobs, self.page_cache)
+        except InputError as e:
+            print_error(e)
+            # The plan set might be incomplete, start over with the next change
+            self.constructionPlanSet = None
+            return
+        except Exception as e:
+            # E.g. the pdf is opened in a viewer, watching goes on with the next change
+            print_error(f'Writing the plan failed: {e!r}')
+            self.constructionPlanSet = None
+            return
+
+        print_info(f'Plan written in {time.perf_counter()-start:.2f}s - made pages: {', '.join(made_layers) if made_layers else 'none'}')
+
+    def update_plan_set(self, entries:List[dict]):
+        cps = self.constructionPlanSet
+
+        if cps is not None and list(map(self.get_entry_key, entries)) == list(map(self.get_entry_key, self.entries)):
+            # Rows inserted or removed above an entry only change its line
+            changed_entries = [entry for entry, old_entry in zip(entries, self.entries) if self.get_entry_content(entry) != self.get_entry_content(old_entry)]
+
+            if all(map(lambda n: (cps.get_layer_key(n['Layer']), n['Identifier']) not in cps.ambiguous_keys, changed_entries)):
+                try:
+                    # The lines are updated first, so errors of dependent entries have their current line
+                    if any(map(lambda n, m: n.get('Line') != m.get('Line'), entries, self.entries)):
+                        cps.update_lines(entries)
+
+                    for entry in changed_entries:
+                        cps.update_data(entry)
+                except Exception:
+                    # Not all changes are applied, the plan set is made again with the next change
+                    self.constructionPlanSet = None
+                    raise
+
+                self.entries = entries
+                return
+
+        # Rows were added, removed or moved
+        self.constructionPlanSet = None
+        cps = ConstructionPlanSet()
+        for entry in entries:
+            cps.add_data(entry)
+        cps.resolve()
+
+        self.entries = entries
+        self.constructionPlanSet = cps
+
+    def get_entry_key(self, entry:dict):
+        return entry['Layer'], entry['Identifier'], entry['Type']
+
+    def get_entry_content(self, entry:dict):
+        return {key: value for key, value in entry.items() if key != 'Line'}
@@ -0,0 +1,163 @@
+from functools import lru_cache
+import re
+from typing import Callable, List, Tuple
+import numpy as np
+from Exceptions.InputError import InputError
+
+
+class PointExpression:
+    '''
+    Compiled form of a point expression like "(Bad-1)+(0,25)".
+
+    Every supported expression is a linear combination of points. It is therefore stored as the sum of all
+    literal points (offset) and a list of weighted point references (factor, identifier, index).
+    '''
+
+    def __init__(self, expression:str, offset:Tuple[float, float], references:List[Tuple[float, str, int]]):
+        self.expression = expression
+        self.offset = offset
+        self.references = tuple(references)
+
+    def evaluate(self, resolve_point:Callable[[str, int], Tuple[float, float]], reference:np.ndarray = None) -> np.ndarray:
+        return np.array(self.evaluate_coordinates(resolve_point, reference))
+
+    def evaluate_coordinates(self, resolve_point:Callable[[str, int], Tuple[float, float]], reference:np.ndarray = None) -> Tuple[float, float]:
+        x, y = self.offset
+
+        for factor, identifier, idx in self.references:
+            ref_x, ref_y = resolve_point(identifier, idx)
+
+            if (reference is not None):
+                ref_x -= reference[0]
+                ref_y -= reference[1]
+
+            x += factor*ref_x
+            y += factor*ref_y
+
+        return x, y
+
+
+_token_pattern = re.compile(r'\s*(?:(\()|([+\-*])|(\d+\.?\d*|\.\d+))')
+_reference_pattern = re.compile(r'(.+)-(\d+)')
+
+
+# Bounded, long running processes (watch, serve) compile the expressions of many plans
+@lru_cache(maxsize=65536)
+def compile_point_expression(expression:str) -> PointExpression:
+    '''
+    Compiles an expression of points and scalars, e.g. "(Bad-6)+(0,25)", "(WZ-3)-(WZ-1)" or "0.5*(Haus-2)".
+    A point is either a literal "(x,y)" or a reference "(<Identifier>-<Index>)". Identical expressions share one
+    compiled object.
+    '''
+    tokens = _tokenize(expression)
+
+    offset_x, offset_y = 0, 0
+    references = []
+
+    pos = 0
+    sign = 1
+    if pos < len(tokens) and tokens[pos] in ('+', '-'):
+        sign = -1 if tokens[pos] == '-' else 1
+        pos += 1
+
+    while True:
+        factor = sign
+        point = None
+
+        while True:
+            if pos >= len(tokens):
+                raise InputError(f'Unable to intepret point: {expression}')
+
+            token = tokens[pos]
+            pos += 1
+            if isinstance(token, tuple):
+                if point is not None:
+                    raise InputError(f'Unable to intepret point: {expression} (points can not be multiplied)')
+                point = token
+            elif isinstance(token, (int, float)):
+                factor *= token
+            else:
+                raise InputError(f'Unable to intepret point: {expression}')
+
+            if pos < len(tokens) and tokens[pos] == '*':
+                pos += 1
+            else:
+                break
+
+        if point is None:
+            raise InputError(f'Unable to intepret point: {expression} (scalar without point)')
+
+        if point[0] == 'reference':
+            references.append((factor, point[1], point[2]))
+        else:
+            offset_x += factor*point[1]
+            offset_y += factor*point[2]
+
+        if pos >= len(tokens):
+            break
+
+        if tokens[pos] not in ('+', '-'):
+            raise InputError(f'Unable to intepret point: {expression}')
+        sign = -1 if tokens[pos] == '-' else 1
+        pos += 1
+
+    return PointExpression(expression, (offset_x, offset_y), references)
+
+
+def _tokenize(expression:str):
+    tokens = []
+
+    pos = 0
+    while pos < len(expression):
+        if expression[pos:].strip() == '':
+            break
+
+        match = _token_pattern.match(expression, pos)
+        if match is None:
+            raise InputError(f'Unable to intepret point: {expression}')
+
+        if match.group(1):
+            end = expression.find(')', match.end())
+            if end < 0:
+                raise InputError(f'Unable to intepret point: {expression} (missing ")")')
+            tokens.append(_parse_point(expression[match.end():end], expression))
+            pos = end + 1
+        elif match.group(2):
+            tokens.append(match.group(2))
+            pos = match.end()
+        else:
+            tokens.append(_parse_number(match.group(3), expression))
+            pos = match.end()
+
+    return tokens
+
+
+def _parse_point(content:str, expression:str):
+    if ',' in content:
+        values = content.split(',')
+        if len(values) != 2:
+            raise InputError(f'Unable to intepret point: {expression}')
+
+        return ('literal', _parse_number(values[0], expression), _parse_number(values[1], expression))
+
+    match = _reference_pattern.fullmatch(content.strip())
+    if match is None:
+        raise InputError(f'Unable to intepret point: {expression}')
+
+    idx = int(match.group(2))-1
+    if (idx < 0):
+        raise InputError(f"Error parsing {expression}: Referencing index must be greater then 0")
+
+    return ('reference', match.group(1), idx)
+
+
+def _parse_number(value:str, expression:str):
+    try:
+        return int(value)
+    except ValueError:
+        pass
+
+    try:
+        return float(value)
+    except ValueError:
+        raise InputError(f'Unable to intepret point: {expression} ("{value.strip()}" is not a number)')
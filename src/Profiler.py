@@ -0,0 +1,114 @@
+from contextlib import contextmanager
+import json
+import time
+import tracemalloc
+from typing import Iterable
+from ConsolePrinter import print_info
+
+
+class ProfileStage:
+    def __init__(self, name:str):
+        self.name = name
+        self.calls = 0
+        self.wall_time = 0.0
+        self.peak_memory = 0
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'calls': self.calls,
+            'wall_time_s': self.wall_time,
+            'peak_memory_bytes': self.peak_memory
+        }
+
+
+class Profiler:
+    '''
+    Measures wall time and peak memory (tracemalloc) of named stages. Stages can be nested, the time of a stage does
+    not include the time of its nested stages. A stage that is entered several times is summed up.
+    A disabled profiler does nothing. Tracing memory slows down the execution considerably, so it can be switched off.
+    '''
+
+    def __init__(self, enabled:bool = False, trace_memory:bool = True):
+        self.enabled = enabled
+        self.trace_memory = enabled and trace_memory
+        self.stages:dict[str, ProfileStage] = dict()
+        self.stack = list()
+        self.start_time = None
+
+        if self.trace_memory:
+            tracemalloc.start()
+        if enabled:
+            self.start_time = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name:str):
+        if not self.enabled:
+            yield
+            return
+
+        if self.trace_memory:
+            if self.stack:
+                # The peak is reset for the nested stage, so the peak of the outer stage has to be kept
+                outer_frame = self.stack[-1]
+                outer_frame[2] = max(outer_frame[2], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+
+        # start time, time of nested stages, peak memory
+        frame = [time.perf_counter(), 0.0, 0]
+        self.stack.append(frame)
+        try:
+            yield
+        finally:
+            self.stack.pop()
+            elapsed = time.perf_counter() - frame[0]
+
+            stage = self.stages.setdefault(name, ProfileStage(name))
+            stage.calls += 1
+            stage.wall_time += elapsed - frame[1]
+            if self.trace_memory:
+                stage.peak_memory = max(stage.peak_memory, frame[2], tracemalloc.get_traced_memory()[1])
+
+            if self.stack:
+                self.stack[-1][1] += elapsed
+
+    def iterate(self, name:str, iterable:Iterable):
+        '''Yields the items of the iterable, the time to get each item is added to the stage.'''
+        if not self.enabled:
+            yield from iterable
+            return
+
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                item = next(iterator, StopIteration)
+            if item is StopIteration:
+                return
+            yield item
+
+    def get_total_wall_time(self):
+        return time.perf_counter() - self.start_time
+
+    def report(self):
+        if not self.enabled:
+            return
+
+        print_info('Profile:')
+        print_info(f'{'Stage':<30} {'Calls':>7} {'Time [s]':>10} {'Peak [MB]':>10}')
+        for stage in self.stages.values():
+            peak_memory = f'{stage.peak_memory/(1024*1024):>10.2f}' if self.trace_memory else f'{'-':>10}'
+            print_info(f'{stage.name:<30} {stage.calls:>7} {stage.wall_time:>10.3f} {peak_memory}')
+        print_info(f'{'Total':<30} {'':>7} {self.get_total_wall_time():>10.3f}')
+
+    def save_json(self, file_path:str, **information):
+        '''Writes the stages and the given information as json trace.'''
+        if not self.enabled:
+            return
+
+        content = dict(information)
+        content['total_wall_time_s'] = self.get_total_wall_time()
+        content['memory_traced'] = self.trace_memory
+        content['stages'] = list(map(lambda n: n.to_dict(), self.stages.values()))
+
+        with open(file_path, 'w') as f:
+            json.dump(content, f, indent=2)
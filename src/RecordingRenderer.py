@@ -0,0 +1,59 @@
+from typing import Callable, List
+import numpy as np
+from PlanRenderer import PlanRenderer
+
+
+class RecordingRenderer(PlanRenderer):
+    '''
+    Records all drawing calls of a page, so the page can be created in another process and drawn later on by
+    replaying it to another renderer.
+    '''
+
+    def __init__(self):
+        self.calls:List[tuple] = list()
+
+    def replay(self, renderer:PlanRenderer):
+        for name, args, kwargs in self.calls:
+            getattr(renderer, name)(*args, **kwargs)
+
+    def begin_page(self, width, height):
+        self.calls.append(('begin_page', (width, height), {}))
+
+    def end_page(self):
+        self.calls.append(('end_page', (), {}))
+
+    def begin_group(self, translation = (0, 0), rotation = 0):
+        self.calls.append(('begin_group', (translation, rotation), {}))
+
+    def end_group(self):
+        self.calls.append(('end_group', (), {}))
+
+    def begin_clip(self, x, y, width, height):
+        self.calls.append(('begin_clip', (x, y, width, height), {}))
+
+    def end_clip(self):
+        self.calls.append(('end_clip', (), {}))
+
+    def symbol(self, name:str, draw:Callable[[PlanRenderer], None], translation = (0, 0), rotation = 0):
+        # The drawing of the symbol is recorded as well, draw itself might not be picklable
+        symbol_recording = RecordingRenderer()
+        draw(symbol_recording)
+        self.calls.append(('symbol', (name, symbol_recording.replay, translation, rotation), {}))
+
+    def rect(self, class_name:str, x, y, width, height):
+        self.calls.append(('rect', (class_name, x, y, width, height), {}))
+
+    def path(self, class_name:str, points:List[np.ndarray], is_closed_path:bool):
+        self.calls.append(('path', (class_name, points, is_closed_path), {}))
+
+    def sector(self, class_name:str, center:np.ndarray, start:np.ndarray, end:np.ndarray, radius, sweep:int):
+        self.calls.append(('sector', (class_name, center, start, end, radius, sweep), {}))
+
+    def line(self, class_name:str, pt1:np.ndarray, pt2:np.ndarray):
+        self.calls.append(('line', (class_name, pt1, pt2), {}))
+
+    def circle(self, class_name:str, center, radius):
+        self.calls.append(('circle', (class_name, center, radius), {}))
+
+    def text(self, class_name:str, x, y, text:str, anchor:str = None, rotation = 0):
+        self.calls.append(('text', (class_name, x, y, text), {'anchor': anchor, 'rotation': rotation}))
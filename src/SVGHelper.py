@@ -1,42 +1,62 @@
-from typing import List
+from functools import lru_cache
+import re
+from typing import List, TextIO
 import numpy as np
 
 
-def gen_line_string(pt1:np.ndarray, pt2:np.ndarray, class_name:str = None, adds:str = None):
-    string = '<line '
+# Negative zeros ("-0.00" -> "0") and trailing zeros ("1.500" -> "1.5", "2.000" -> "2") of fixed precision numbers
+redundant_characters_pattern = re.compile(r'-(0)(?:\.0+)?(?![\d.])|\.0+\b|(\.\d*?[1-9])0+\b')
+
+
+def escape(text:str):
+    '''Escapes &, < and > like xml.sax.saxutils.escape, which imports urllib and is slow to load.'''
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+def format_fixed(values:tuple, precision:int, value_format:str, separator:str) -> str:
+    '''
+    Formats all values in one call. value_format contains one "%s" per value it formats, it is repeated for all values
+    and joined by the separator. Numbers get at most precision decimal places and no trailing zeros.
+    '''
+    text = get_fixed_format(precision, value_format, separator, len(values)) % values
+    return redundant_characters_pattern.sub(r'\1\2', text)
+
+@lru_cache(maxsize=1024)
+def get_fixed_format(precision:int, value_format:str, separator:str, count:int) -> str:
+    value_format = value_format.replace('%s', f'%.{precision}f')
+    return separator.join([value_format]*(count//value_format.count('%')))
+
+def format_numbers(values:tuple, precision:int = None) -> List[str]:
+    '''Returns the values formatted with format_fixed or as they are if precision is None.'''
+    if precision is None:
+        return list(map(str, values))
+    return format_fixed(values, precision, '%s', '\0').split('\0')
+
+def format_points(pts, precision:int = None) -> str:
+    '''Returns the points as path data ("x1 y1 Lx2 y2 ...").'''
+    if precision is None:
+        return ' L'.join(map(lambda n: f'{n[0]} {n[1]}', pts))
+    return format_fixed(tuple(np.asarray(pts, dtype=float).ravel().tolist()), precision, '%s %s', ' L')
+
+def write_line(stream:TextIO, pt1:np.ndarray, pt2:np.ndarray, class_name:str = None, adds:str = None, precision:int = None):
+    stream.write('<line ')
     if class_name:
-        string += f'class="{class_name}" '
+        stream.write(f'class="{class_name}" ')
     if adds:
-        string += f'{adds} '
-    string += f'x1="{pt1[0]}" '
-    string += f'y1="{pt1[1]}" '
-    string += f'x2="{pt2[0]}" '
-    string += f'y2="{pt2[1]}" '
-    string += f'/>'
-
-    return string
+        stream.write(f'{adds} ')
+    x1, y1, x2, y2 = format_numbers((pt1[0], pt1[1], pt2[0], pt2[1]), precision)
+    stream.write(f'x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}" />')
 
-def gen_path_string(pts:List[np.ndarray], is_closed_path:bool, class_name:str = None, adds:str = None):
-    string = '<path '
+def write_path(stream:TextIO, pts:List[np.ndarray], is_closed_path:bool, class_name:str = None, adds:str = None, precision:int = None):
+    stream.write('<path ')
     if class_name:
-        string += f'class="{class_name}" '
+        stream.write(f'class="{class_name}" ')
     if adds:
-        string += f'{adds} '
-    
-    sub_string = ''
-    for i in range(0,len(pts)):
-        if i == 0:
-            sub_string += 'M'
-        else:
-            sub_string += ' L'
-        
-        pt = pts[i]
-        sub_string += f'{pt[0]} {pt[1]}'
+        stream.write(f'{adds} ')
 
+    stream.write('d="')
+    if len(pts) > 0:
+        stream.write('M')
+        stream.write(format_points(pts, precision))
     if is_closed_path:
-        sub_string += ' Z'
-
-    string += f'd="{sub_string}" '
-    string += f'/>'
-
-    return string
\ No newline at end of file
+        stream.write(' Z')
+    stream.write('" />')
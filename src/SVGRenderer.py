@@ -0,0 +1,121 @@
+from functools import lru_cache
+from io import StringIO
+from typing import Callable, List, TextIO
+import numpy as np
+from PlanRenderer import PlanRenderer
+import PlanStyle
+import SVGHelper
+
+
+class SVGRenderer(PlanRenderer):
+    '''
+    Renders a page as svg document. The document is written piece by piece to the given text stream.
+    Coordinates are written with at most precision decimal places (as they are if precision is None).
+    '''
+
+    def __init__(self, stream:TextIO, precision:int = None):
+        self.stream = stream
+        self.precision = precision
+        self.clip_count = 0
+
+    def format(self, *values) -> List[str]:
+        return SVGHelper.format_numbers(values, self.precision)
+
+    def begin_page(self, width, height):
+        width, height = self.format(width, height)
+        self.stream.write(f'<svg width="{width}" height="{height}" xmls="http://www.x3.org/2000/svg">\n')
+        self.stream.write(get_style_block())
+
+    def end_page(self):
+        self.stream.write('</svg>')
+
+    def begin_group(self, translation = (0, 0), rotation = 0):
+        x, y = self.format(translation[0], translation[1])
+        transform = f'translate({x} {y})'
+        if rotation != 0:
+            transform += f' rotate({rotation} 0 0)'
+
+        self.stream.write(f'<g transform="{transform}">\n')
+
+    def end_group(self):
+        self.stream.write('</g>\n')
+
+    def begin_clip(self, x, y, width, height):
+        self.clip_count += 1
+        clip_id = f'clip{self.clip_count}'
+
+        x, y, width, height = self.format(x, y, width, height)
+        self.stream.write(f'<clipPath id="{clip_id}"><rect width="{width}" height="{height}" x="{x}" y="{y}" /></clipPath>\n')
+        self.stream.write(f'<g clip-path="url(#{clip_id})">\n')
+
+    def end_clip(self):
+        self.stream.write('</g>\n')
+
+    def symbol(self, name:str, draw:Callable[[PlanRenderer], None], translation = (0, 0), rotation = 0):
+        fragment = symbol_fragments.get((name, self.precision))
+        if fragment is None:
+            fragment_stream = StringIO()
+            draw(SVGRenderer(fragment_stream, self.precision))
+            fragment = fragment_stream.getvalue()
+            symbol_fragments[(name, self.precision)] = fragment
+
+        # Every page is an svg document of its own, so the markup is written instead of referenced with <use>
+        is_transformed = tuple(translation) != (0, 0) or rotation != 0
+        if is_transformed:
+            self.begin_group(translation, rotation)
+        self.stream.write(fragment)
+        if is_transformed:
+            self.end_group()
+
+    def rect(self, class_name:str, x, y, width, height):
+        x, y, width, height = self.format(x, y, width, height)
+        self.stream.write(f'<rect class="{class_name}" width="{width}" height="{height}" x="{x}" y="{y}" />\n')
+
+    def path(self, class_name:str, points:List[np.ndarray], is_closed_path:bool):
+        SVGHelper.write_path(self.stream, points, is_closed_path, class_name, precision=self.precision)
+        self.stream.write('\n')
+
+    def sector(self, class_name:str, center:np.ndarray, start:np.ndarray, end:np.ndarray, radius, sweep:int):
+        cx, cy, x1, y1, r, x2, y2 = self.format(center[0], center[1], start[0], start[1], radius, end[0], end[1])
+        path_data = f'M{cx} {cy} L{x1} {y1} A{r} {r} 0 0 {sweep} {x2} {y2} Z'
+        self.stream.write(f'<path class="{class_name}" d="{path_data}" />\n')
+
+    def line(self, class_name:str, pt1:np.ndarray, pt2:np.ndarray):
+        SVGHelper.write_line(self.stream, pt1, pt2, class_name, precision=self.precision)
+        self.stream.write('\n')
+
+    def circle(self, class_name:str, center, radius):
+        cx, cy, r = self.format(center[0], center[1], radius)
+        self.stream.write(f'<circle class="{class_name}" cx="{cx}" cy="{cy}" r="{r}" />\n')
+
+    def text(self, class_name:str, x, y, text:str, anchor:str = None, rotation = 0):
+        attributes = f'class="{class_name}"'
+        if anchor:
+            attributes += f' text-anchor="{anchor}"'
+
+        x, y = self.format(x, y)
+
+        if rotation != 0:
+            attributes += f' transform="translate({x} {y}) rotate({rotation})"'
+        else:
+            attributes += f' x="{x}" y="{y}"'
+
+        self.stream.write(f'<text {attributes}>{SVGHelper.escape(str(text))}</text>\n')
+
+
+# Markup of the symbols drawn so far in this process by name and precision
+symbol_fragments:dict[tuple[str, int], str] = dict()
+
+@lru_cache(maxsize=None)
+def get_style_block() -> str:
+    '''Returns the <style> block of PlanStyle.styles, it is the same for every page.'''
+    style_block = StringIO()
+    style_block.write('<style>\n')
+    for class_name, properties in PlanStyle.styles.items():
+        style_block.write(f'.{class_name} {{\n')
+        for property_name, value in properties.items():
+            style_block.write(f'{property_name}: {value};\n')
+        style_block.write('}\n')
+    style_block.write('</style>\n')
+
+    return style_block.getvalue()
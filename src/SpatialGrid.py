@@ -0,0 +1,48 @@
+import math
+from typing import List
+import numpy as np
+
+
+class SpatialGrid:
+    '''
+    Uniform grid over bounding boxes (x_min, x_max, y_min, y_max). Every box is registered in each cell it overlaps,
+    so a query only has to check the boxes of the cells the queried area overlaps instead of all boxes.
+    Empty boxes (x_min > x_max) are never found.
+    '''
+
+    def __init__(self, boundries:np.ndarray, cell_size:float):
+        self.boundries = np.asarray(boundries, dtype=float).reshape(-1, 4)
+        self.cell_size = cell_size
+        self.cells:dict[tuple[int, int], List[int]] = dict()
+
+        is_empty = (self.boundries[:, 0] > self.boundries[:, 1]) | (self.boundries[:, 2] > self.boundries[:, 3])
+        filled_indices = np.flatnonzero(~is_empty)
+
+        filled = self.boundries[filled_indices]
+        self.origin = (filled[:, 0].min(), filled[:, 2].min()) if len(filled) > 0 else (0, 0)
+
+        cell_ranges = np.floor((filled - np.repeat(self.origin, 2)) / cell_size).astype(int)
+        for i, (col_min, col_max, row_min, row_max) in zip(filled_indices, cell_ranges):
+            for row in range(row_min, row_max+1):
+                for col in range(col_min, col_max+1):
+                    self.cells.setdefault((col, row), list()).append(i)
+
+    def query(self, x_min, x_max, y_min, y_max) -> np.ndarray:
+        '''Returns the indices (in ascending order) of all boxes intersecting the area.'''
+        col_min = math.floor((x_min - self.origin[0]) / self.cell_size)
+        col_max = math.floor((x_max - self.origin[0]) / self.cell_size)
+        row_min = math.floor((y_min - self.origin[1]) / self.cell_size)
+        row_max = math.floor((y_max - self.origin[1]) / self.cell_size)
+
+        candidates = set()
+        for row in range(row_min, row_max+1):
+            for col in range(col_min, col_max+1):
+                candidates.update(self.cells.get((col, row), ()))
+
+        candidates = np.fromiter(candidates, dtype=int, count=len(candidates))
+        candidates.sort()
+
+        # Boxes of a cell only overlap the cell, not necessarily the area
+        boundries = self.boundries[candidates]
+        is_intersecting = (boundries[:, 0] <= x_max) & (boundries[:, 1] >= x_min) & (boundries[:, 2] <= y_max) & (boundries[:, 3] >= y_min)
+        return candidates[is_intersecting]
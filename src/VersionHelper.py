@@ -1,7 +1,9 @@
+from functools import lru_cache
 import os
 import re
 import sys
 
+@lru_cache(maxsize=None)
 def get_version():
     version_path = resource_path('version.txt')
     
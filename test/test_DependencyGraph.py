@@ -0,0 +1,64 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from ConstructionPlanSet import ConstructionPlanSet
+from DependencyGraph import DependencyGraph
+
+
+class DependencyGraphTest(unittest.TestCase):
+    def make_graph(self, dependencies:dict[int, list[int]]) -> DependencyGraph:
+        graph = DependencyGraph()
+        for node, node_dependencies in dependencies.items():
+            graph.set_dependencies(node, node_dependencies)
+        return graph
+
+    def test_overlapping_cycles(self):
+        # 0 and 2 both form a cycle with 1
+        graph = self.make_graph({0: [1], 1: [0, 2], 2: [1], 3: [2]})
+        order, cyclic_nodes = graph.get_topological_order(range(4))
+
+        self.assertEqual(order, [])
+        self.assertEqual(graph.find_cycles(cyclic_nodes), [[0, 1, 0], [2, 1, 2]])
+
+    def test_cycle_needing_larger_dependency(self):
+        # The smallest dependency of 1 leads out of the cycle
+        graph = self.make_graph({0: [], 1: [0, 2], 2: [1]})
+
+        self.assertEqual(graph.find_cycles([1, 2]), [[1, 2, 1]])
+
+    def test_self_reference(self):
+        graph = self.make_graph({0: [0], 1: [0]})
+
+        self.assertEqual(graph.find_cycles([0, 1]), [[0, 0]])
+
+    def test_long_chain(self):
+        # Deeper than the recursion limit
+        count = 5000
+        graph = self.make_graph({node: [(node+1) % count] for node in range(count)})
+
+        self.assertEqual(graph.find_cycles(range(count)), [list(range(count)) + [0]])
+
+
+class CircularReferenceTest(unittest.TestCase):
+    def add_room(self, constructionPlanSet:ConstructionPlanSet, line:int, identifier:str, payload:list[str]):
+        constructionPlanSet.add_data({'Line': line, 'Identifier': identifier, 'Layer': 'EG', 'Type': 'Room', 'DimOffset': '', 'Reference': '', 'Payload': payload})
+
+    def test_every_entry_of_overlapping_cycles_is_reported(self):
+        constructionPlanSet = ConstructionPlanSet()
+        self.add_room(constructionPlanSet, 2, 'A', ['(B-2)'])
+        self.add_room(constructionPlanSet, 3, 'B', ['(A-1)', '(C-1)'])
+        self.add_room(constructionPlanSet, 4, 'C', ['(B-2)'])
+
+        errors = constructionPlanSet.try_resolve()
+
+        self.assertEqual(list(map(str, errors)), [
+            'line 2 - A (EG): Circular reference in layer "EG": A -> B -> A',
+            'line 4 - C (EG): Circular reference in layer "EG": C -> B -> C',
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
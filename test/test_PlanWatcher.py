@@ -0,0 +1,65 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from Exceptions.InputError import InputError
+from PlanWatcher import PlanWatcher
+
+
+def make_entries(first_line:int, room_a_point:str = '(0,0)') -> list[dict]:
+    rows = [
+        ('ScaleDivisor', '', 'Settings', ['50']),
+        ('A', 'EG', 'Room', [room_a_point, '(100,0)', '(100,100)']),
+        ('B', 'EG', 'Room', ['(A-2)', '(200,0)', '(200,100)']),
+        ('D', 'EG', 'XDim', ['(A-1)', '(B-2)']),
+        ('D', 'EG', 'XDim', ['(B-1)', '(B-2)']),
+    ]
+    return [{'Line': first_line + i, 'Identifier': identifier, 'Layer': layer, 'Type': data_type, 'DimOffset': '', 'Reference': '', 'Payload': payload}
+            for i, (identifier, layer, data_type, payload) in enumerate(rows)]
+
+
+class PlanWatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.planWatcher = PlanWatcher('plan.csv', None, 'plan', False, 'reportlab', False, 1)
+        self.planWatcher.update_plan_set(make_entries(2))
+
+        self.updated_entries = list()
+        update_data = self.planWatcher.constructionPlanSet.update_data
+        def record_update_data(date):
+            self.updated_entries.append(date)
+            return update_data(date)
+        self.planWatcher.constructionPlanSet.update_data = record_update_data
+
+    def test_moved_lines_are_not_recalculated(self):
+        cps = self.planWatcher.constructionPlanSet
+        self.planWatcher.update_plan_set(make_entries(5))
+
+        self.assertIs(self.planWatcher.constructionPlanSet, cps)
+        self.assertEqual(self.updated_entries, [])
+        self.assertEqual(sorted(map(lambda n: n['Line'], cps.entries.values())), [6, 7, 8, 9])
+        self.assertEqual(cps.setting_lines['ScaleDivisor'], 5)
+
+    def test_changed_entry_is_recalculated(self):
+        entries = make_entries(3, '(10,0)')
+        self.planWatcher.update_plan_set(entries)
+
+        self.assertEqual(self.updated_entries, [entries[1]])
+        self.assertEqual(self.planWatcher.entries, entries)
+
+    def test_failed_update_makes_plan_set_again(self):
+        with self.assertRaises(InputError):
+            self.planWatcher.update_plan_set(make_entries(2, '(A-1)'))
+
+        self.assertIsNone(self.planWatcher.constructionPlanSet)
+
+        entries = make_entries(2, '(10,0)')
+        self.planWatcher.update_plan_set(entries)
+
+        self.assertEqual(self.planWatcher.entries, entries)
+        self.assertEqual(self.planWatcher.constructionPlanSet.get_part('A', 'EG').points[0].tolist(), [10, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()